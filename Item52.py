@@ -247,4 +247,284 @@ except subprocess.TimeoutExpired:
     proc.terminate()
     proc.wait()
 
-print('Exit status without exception', proc.poll())
\ No newline at end of file
+print('Exit status without exception', proc.poll())
+
+# Example 12:  run_encrypt and run_hash start two new processes for every buffer, and for small
+# inputs the process startup dominates.   The openssl command line tools can't serve more than one
+# request per process, so for the pooled version the child is a small long-lived Python program
+# that performs the same encrypt-then-hash chain on each request.   hashlib stands in for openssl
+# here: a SHAKE-256 keystream plays the cipher and BLAKE2b plays Whirlpool, which OpenSSL 3 no
+# longer enables by default.   Requests and responses are framed as a 4-byte big-endian length
+# followed by the payload, so many inputs can be streamed through the same pipes.
+import struct
+import sys
+
+FRAME = struct.Struct('>I')
+
+WORKER_SOURCE = r'''
+import hashlib
+import os
+import struct
+import sys
+
+FRAME = struct.Struct('>I')
+PASSWORD = os.environ['password'].encode()
+
+def read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        sys.exit(0)  # The parent closed our stdin
+    return data
+
+def encrypt_then_hash(data):
+    nonce = os.urandom(8)
+    key = hashlib.shake_256(PASSWORD + nonce).digest(len(data))
+    encrypted = nonce + bytes(a ^ b for a, b in zip(data, key))
+    return hashlib.blake2b(encrypted).digest()
+
+stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+while True:
+    size, = FRAME.unpack(read_exact(stdin, FRAME.size))
+    result = encrypt_then_hash(read_exact(stdin, size))
+    stdout.write(FRAME.pack(len(result)) + result)
+    stdout.flush()
+'''
+
+def start_worker():
+    env = os.environ.copy()
+    env['password'] = 'zf7ShyBhZOraQDdE/FiZpm/m/8f9X+M1'
+    return subprocess.Popen(
+        [sys.executable, '-c', WORKER_SOURCE],
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE)
+
+
+# Example 13:  Reading a response must not hang forever if a child gets stuck, so read_frame waits
+# on the pipe with select until a deadline.   (select only works on pipes on POSIX systems.)
+# Writing can hang too: a child that stops reading fills the pipe buffer (about 64 KiB), so
+# write_frame writes to a non-blocking pipe and waits for it to become writable under the same
+# deadline.
+import select
+
+def write_frame(proc, data, deadline):
+    fd = proc.stdin.fileno()
+    os.set_blocking(fd, False)
+    data = memoryview(FRAME.pack(len(data)) + data)
+    while data:
+        remaining = deadline - time.monotonic()
+        _, ready, _ = select.select([], [fd], [], max(remaining, 0))
+        if not ready:
+            raise subprocess.TimeoutExpired(proc.args, 0)
+        try:
+            data = data[os.write(fd, data):]
+        except BlockingIOError:
+            pass
+
+def read_exact(proc, size, deadline):
+    fd = proc.stdout.fileno()
+    chunks = []
+    while size:
+        remaining = deadline - time.monotonic()
+        ready, _, _ = select.select([fd], [], [], max(remaining, 0))
+        if not ready:
+            raise subprocess.TimeoutExpired(proc.args, 0)
+        chunk = os.read(fd, size)
+        if not chunk:
+            raise EOFError('Worker exited')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def read_frame(proc, timeout):
+    deadline = time.monotonic() + timeout
+    size, = FRAME.unpack(read_exact(proc, FRAME.size, deadline))
+    return read_exact(proc, size, deadline)
+
+
+# Example 14:  The pool keeps size children alive and hands each request to an idle one, so at most
+# size requests run at once.   A child that times out is killed and replaced.   close sends EOF to
+# every child and uses communicate(timeout=...) to wait for it, killing any child that doesn't exit
+# in time, so a stuck child never hangs the caller.
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+class WorkerPool:
+    def __init__(self, size=4, timeout=5):
+        self.size = size
+        self.timeout = timeout
+        self.idle = Queue()
+        self.procs = []
+        for _ in range(size):
+            self.idle.put(self.spawn())
+
+    def spawn(self):
+        proc = start_worker()
+        self.procs.append(proc)
+        return proc
+
+    def call(self, data):
+        proc = self.idle.get()
+        try:
+            write_frame(proc, data, time.monotonic() + self.timeout)
+            return read_frame(proc, self.timeout)
+        except (subprocess.TimeoutExpired, EOFError, BrokenPipeError):
+            self.discard(proc)
+            proc = self.spawn()
+            raise
+        finally:
+            self.idle.put(proc)
+
+    def discard(self, proc):
+        proc.kill()
+        proc.wait()
+        for pipe in (proc.stdin, proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass  # Unflushed data for a dead child
+        self.procs.remove(proc)
+
+    def map(self, inputs):
+        with ThreadPoolExecutor(self.size) as executor:
+            return list(executor.map(self.call, inputs))
+
+    def close(self):
+        for proc in self.procs:
+            try:
+                proc.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+# Example 15:  Starting a fresh child per input, the way Example 9 does, compared with the pool.
+def run_once(data):
+    proc = start_worker()
+    proc.stdin.write(FRAME.pack(len(data)) + data)
+    try:
+        out, _ = proc.communicate(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        raise
+    return out[FRAME.size:]
+
+inputs = [os.urandom(100) for _ in range(100)]
+
+start = time.time()
+with ThreadPoolExecutor(4) as executor:
+    fresh_results = list(executor.map(run_once, inputs))
+delta = time.time() - start
+print(f'Fresh child per input: {len(fresh_results)} hashes in {delta:.3f} seconds')
+
+start = time.time()
+with WorkerPool(size=4) as pool:
+    pooled_results = pool.map(inputs)
+delta = time.time() - start
+print(f'Persistent pool:       {len(pooled_results)} hashes in {delta:.3f} seconds')
+assert all(len(result) == 64 for result in pooled_results)
+
+# A child that stops reading can't block a large write past the timeout.
+class StuckPool(WorkerPool):
+    def spawn(self):
+        proc = subprocess.Popen(
+            [sys.executable, '-c', 'import time; time.sleep(60)'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE)
+        self.procs.append(proc)
+        return proc
+
+start = time.time()
+with StuckPool(size=1, timeout=0.5) as pool:
+    try:
+        pool.call(os.urandom(1024 * 1024))
+    except subprocess.TimeoutExpired:
+        pass  # Expected
+    else:
+        assert False
+delta = time.time() - start
+print(f'Stuck child timed out after {delta:.3f} seconds')
+
+
+# Example 16:  Managing many children with Popen means polling proc.poll() in a sleep loop or
+# blocking on communicate() one child at a time.   asyncio can wait on all of them at once.
+# run_child streams the input to the child in chunks and hands each chunk of output to sink as it
+# arrives, so no payload is ever held in memory whole.   The semaphore bounds how many children
+# run at once, and a child that takes longer than timeout is killed.
+import asyncio
+import hashlib
+
+async def run_child(args, chunks, sink, semaphore, timeout, env=None):
+    async with semaphore:
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            env=env,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL)
+
+        async def feed():
+            try:
+                for chunk in chunks:
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+                proc.stdin.close()
+                await proc.stdin.wait_closed()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The child exited early; its status says why
+
+        async def drain():
+            while chunk := await proc.stdout.read(64 * 1024):
+                sink(chunk)
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(feed(), drain(), proc.wait()), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+
+        return args, proc.returncode
+
+
+# Example 17:  Hundreds of openssl children encrypt 64 KB each, fed in 16 KB chunks, while
+# the parent hashes each output stream as it arrives.   A few sleep commands play stragglers and
+# are killed by the timeout.   Exit statuses are collected in the order the children finish.
+def random_chunks(count, size):
+    for _ in range(count):
+        yield os.urandom(size)
+
+async def fan_out(child_count, straggler_count, timeout):
+    env = os.environ.copy()
+    env['password'] = 'zf7ShyBhZOraQDdE/FiZpm/m/8f9X+M1'
+    semaphore = asyncio.Semaphore(50)
+    digests = []
+
+    coros = []
+    for _ in range(child_count):
+        digest = hashlib.sha256()
+        digests.append(digest)
+        args = ['openssl', 'enc', '-des3', '-pbkdf2', '-pass', 'env:password']
+        coros.append(run_child(args, random_chunks(4, 16 * 1024),
+                               digest.update, semaphore, timeout, env))
+    for _ in range(straggler_count):
+        coros.append(run_child(['sleep', '10'], [], lambda chunk: None,
+                               semaphore, timeout))
+
+    statuses = {}
+    for future in asyncio.as_completed(coros):
+        args, returncode = await future
+        statuses[returncode] = statuses.get(returncode, 0) + 1
+    return statuses
+
+start = time.time()
+statuses = asyncio.run(fan_out(200, 3, timeout=2))
+delta = time.time() - start
+print(f'Exit statuses {statuses} in {delta:.3f} seconds')
@@ -153,4 +153,452 @@ for thread in threads:
 
 end = time.time()
 delta = end - start
-print(f'Took {delta:.3f} seconds')
\ No newline at end of file
+print(f'Took {delta:.3f} seconds')
+
+# Example 10:  factorize tests every i from 1 to number, so factoring a 7-digit number takes a
+# second or more.   A faster engine finds the prime factorization first and builds the divisors
+# from it.   Trial division starts with a cached sieve of small primes; small_primes is computed
+# once per limit with the Sieve of Eratosthenes.
+import functools
+import math
+import random
+
+@functools.lru_cache
+def small_primes(limit=1000):
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[0:2] = b'\x00\x00'
+    for i in range(2, math.isqrt(limit) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit + 1, i)))
+    return tuple(i for i, is_prime in enumerate(sieve) if is_prime)
+
+
+# Example 11:  Past the sieve, trial division uses a mod-30 wheel: after 2, 3 and 5 only numbers
+# that are 1, 7, 11, 13, 17, 19, 23 or 29 mod 30 can be prime, so we skip 73% of candidates.
+# trial_divide stops at the square root of what is left of n, or at limit, and returns the
+# factors it found plus the cofactor it could not split.
+WHEEL_STEPS = (4, 2, 4, 2, 4, 6, 2, 6)   # 7, 11, 13, 17, 19, 23, 29, 31, ...
+
+def trial_divide(n, limit=10_000):
+    factors = []
+    for p in small_primes():
+        if p * p > n:
+            break
+        while n % p == 0:
+            factors.append(p)
+            n //= p
+
+    # Start at the first wheel number past the sieve, with the step that follows it
+    candidate = small_primes()[-1]
+    candidate -= (candidate - 7) % 30   # Last number at or below it that is 7 mod 30
+    step = 0
+    while candidate <= small_primes()[-1]:
+        candidate += WHEEL_STEPS[step]
+        step = (step + 1) % len(WHEEL_STEPS)
+    while candidate <= limit and candidate * candidate <= n:
+        while n % candidate == 0:
+            factors.append(candidate)
+            n //= candidate
+        candidate += WHEEL_STEPS[step]
+        step = (step + 1) % len(WHEEL_STEPS)
+    return factors, n
+
+
+# Example 12:  Large cofactors are tested with Miller-Rabin, which is deterministic for n below
+# 3.3 * 10**24 with these bases, and composites are split with Pollard's rho (Brent's variant).
+MILLER_RABIN_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+def is_prime(n):
+    if n < 2:
+        return False
+    for p in MILLER_RABIN_BASES:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in MILLER_RABIN_BASES:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def pollard_rho(n):
+    if n % 2 == 0:
+        return 2
+    while True:
+        y, c, m = random.randrange(1, n), random.randrange(1, n), 128
+        g = r = q = 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = math.gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = math.gcd(abs(x - ys), n)
+        if g != n:
+            return g
+
+def split_large(n, factors):
+    if n == 1:
+        return
+    if is_prime(n):
+        factors.append(n)
+        return
+    d = pollard_rho(n)
+    split_large(d, factors)
+    split_large(n // d, factors)
+
+
+# Example 13:  prime_factors combines the pieces and returns {prime: exponent}.   divisors builds
+# every divisor from the exponents, and factorize keeps the original generator interface: it
+# yields the divisors of number in increasing order.
+from collections import Counter
+
+def prime_factors(number, trial_limit=10_000):
+    if number < 1:
+        raise ValueError(f'{number} has no prime factorization')
+    factors, rest = trial_divide(number, trial_limit)
+    if rest > 1 and rest < trial_limit * trial_limit:
+        factors.append(rest)   # No factor below its square root, so prime
+    else:
+        split_large(rest, factors)
+    return dict(sorted(Counter(factors).items()))
+
+def divisors(number):
+    if number < 1:
+        return []   # Like the original factorize, which yields nothing
+    result = [1]
+    for prime, exponent in prime_factors(number).items():
+        result = [d * prime ** e for d in result
+                  for e in range(exponent + 1)]
+    return sorted(result)
+
+def factorize(number):
+    yield from divisors(number)
+
+# Semiprimes of primes just past the sieve must not pass for primes
+assert prime_factors(1009 * 1013) == {1009: 1, 1013: 1}
+assert prime_factors(1009 ** 2) == {1009: 2}
+assert prime_factors(1019 * 1021 * 9973) == {1019: 1, 1021: 1, 9973: 1}
+assert list(factorize(7 * 1019 * 1021)) == [
+    1, 7, 1019, 1021, 7 * 1019, 7 * 1021, 1019 * 1021, 7 * 1019 * 1021]
+assert list(factorize(0)) == []
+
+
+# Example 14:  For many inputs factorize_many spreads the work across processes.   Each worker
+# handles a chunk of numbers at a time to keep pickling overhead low.   Like Item 55's process
+# stages this relies on the fork start method to see functions defined in this script, so it must
+# only be called while no other threads are running; a child forked while another thread holds a
+# lock can deadlock.   Windows has no fork, so there the numbers are factored in this process.
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+def factorize_list(number):
+    return list(factorize(number))
+
+def factorize_many(numbers, max_workers=None, chunksize=None):
+    numbers = list(numbers)
+    if os.name == 'nt':
+        return [factorize_list(number) for number in numbers]
+    context = multiprocessing.get_context('fork')
+    max_workers = max_workers or os.cpu_count()
+    if chunksize is None:
+        chunksize = max(1, len(numbers) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers, mp_context=context) as pool:
+        return list(pool.map(factorize_list, numbers, chunksize=chunksize))
+
+
+# Example 15:  The new factorize gives the same answers as before for the numbers from Example 2,
+# and it also handles numbers far too large for the old loop.
+start = time.time()
+for number in numbers:
+    assert list(factorize(number)) == [
+        i for i in range(1, number + 1) if number % i == 0]
+print(f'Checked against the original loop in {time.time() - start:.3f} seconds')
+
+start = time.time()
+for number in numbers:
+    list(factorize(number))
+end = time.time()
+print(f'New factorize took {end - start:.6f} seconds')
+
+large = (2 ** 61 - 1) * 1_000_000_007 * 999_983 ** 2
+print(large, prime_factors(large), len(divisors(large)), 'divisors')
+
+start = time.time()
+batch = [random.randrange(10 ** 12, 10 ** 13) for _ in range(2000)]
+results = factorize_many(batch)
+end = time.time()
+assert all(result[-1] == number for result, number in zip(results, batch))
+print(f'Factored {len(batch)} 13-digit numbers in {end - start:.3f} seconds')
+
+
+# Example 16:  Example 8 starts one Thread per slow_systemcall so the waits overlap with
+# compute_helicopter_location.   For hundreds or thousands of waits that means hundreds or thousands
+# of threads.   Multiplexer waits on all of them in a single thread with the selectors module.
+# wait_readable and wait_writable return a concurrent.futures.Future that resolves to True when
+# the file object is ready or False when the timeout expires, and callbacks can be attached with
+# add_done_callback.   Other threads hand requests over through a deque and wake the selector by
+# writing to a socketpair.   Several waits may share one file object, so each selector key holds a
+# list of (events, future) waiters and is registered for the union of their events.
+import heapq
+import itertools
+import selectors
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+
+class Multiplexer(Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.selector = selectors.DefaultSelector()
+        self.requests = deque()
+        self.cancelled = deque()   # File objects whose waits were cancelled
+        self.deadlines = []   # Heap of (deadline, tiebreak, fileobj, future)
+        self.counter = itertools.count()
+        self.waker, self.wakee = socket.socketpair()
+        self.wakee.setblocking(False)
+        self.selector.register(self.wakee, selectors.EVENT_READ)
+        self.running = True
+
+    def wait_readable(self, fileobj, timeout=None):
+        return self.submit(fileobj, selectors.EVENT_READ, timeout)
+
+    def wait_writable(self, fileobj, timeout=None):
+        return self.submit(fileobj, selectors.EVENT_WRITE, timeout)
+
+    def submit(self, fileobj, events, timeout):
+        future = Future()
+        future.add_done_callback(
+            lambda future: self.on_done(fileobj, future))
+        self.requests.append((fileobj, events, timeout, future))
+        self.waker.send(b'x')
+        return future
+
+    def on_done(self, fileobj, future):
+        # A cancelled wait must leave the selector, or a later socket that reuses its fd would
+        # find the stale key
+        if future.cancelled() and self.running:
+            self.cancelled.append(fileobj)
+            self.waker.send(b'x')
+
+    def stop(self):
+        self.running = False
+        self.waker.send(b'x')
+        self.join()
+        while self.requests:
+            self.requests.popleft()[3].cancel()
+
+
+# Example 17:  The selector loop registers new requests, sleeps until something is ready or the
+# nearest deadline passes, and resolves the futures.   Only this thread ever touches the selector.
+# A request that can't be registered, such as one for a closed socket, fails its own future with
+# the exception instead of killing the thread and stranding every other wait, and so does any
+# other selector error on that file object.   Waiters whose futures are already done are dropped
+# whenever their key is touched, and a key whose socket was closed and whose fd now belongs to a
+# new socket is replaced.
+    def run(self):
+        while self.running:
+            while self.cancelled:
+                self.update_waiters(self.cancelled.popleft(), None)
+            self.register_requests()
+            timeout = None
+            if self.deadlines:
+                timeout = max(self.deadlines[0][0] - time.monotonic(), 0)
+            for key, mask in self.selector.select(timeout):
+                if key.fileobj is self.wakee:
+                    self.drain_waker()
+                else:
+                    self.finish(key.fileobj, mask)
+            self.expire_deadlines()
+
+        for key in list(self.selector.get_map().values()):
+            if key.data is not None:
+                for _, future in key.data:
+                    future.cancel()
+        self.selector.close()
+
+    def register_requests(self):
+        while self.requests:
+            fileobj, events, timeout, future = self.requests.popleft()
+            if future.done():
+                continue   # Cancelled before it was registered
+            try:
+                self.add_waiter(fileobj, events, future)
+            except Exception as e:
+                fail(future, e)
+                continue
+            if timeout is not None:
+                deadline = time.monotonic() + timeout
+                heapq.heappush(self.deadlines, (
+                    deadline, next(self.counter), fileobj, future))
+
+    def drain_waker(self):
+        try:
+            while self.wakee.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def add_waiter(self, fileobj, events, future):
+        try:
+            key = self.selector.get_key(fileobj)
+        except KeyError:
+            self.selector.register(fileobj, events, [(events, future)])
+            return
+        if key.fileobj is not fileobj:
+            # The old socket was closed and its fd reused, so its waits can never finish
+            for _, stale in key.data:
+                stale.cancel()
+            self.selector.unregister(key.fileobj)
+            self.selector.register(fileobj, events, [(events, future)])
+            return
+        self.update_waiters(fileobj, key.data + [(events, future)])
+
+    def key_for(self, fileobj):
+        try:
+            key = self.selector.get_key(fileobj)
+        except (KeyError, ValueError):
+            return None
+        return key if key.fileobj is fileobj else None   # Not a reused fd
+
+    def waiters(self, fileobj):
+        key = self.key_for(fileobj)
+        return key.data if key else []
+
+    def update_waiters(self, fileobj, waiters):
+        if waiters is None:
+            waiters = self.waiters(fileobj)
+        waiters = [waiter for waiter in waiters if not waiter[1].done()]
+        try:
+            if waiters:
+                events = 0
+                for waiter_events, _ in waiters:
+                    events |= waiter_events
+                self.selector.modify(fileobj, events, waiters)
+            elif self.key_for(fileobj):
+                self.selector.unregister(fileobj)
+        except Exception as e:
+            # For example the caller closed the socket: fail only the waits on it
+            for _, future in waiters:
+                fail(future, e)
+            try:
+                self.selector.unregister(fileobj)
+            except Exception:
+                pass
+
+    def finish(self, fileobj, mask):
+        waiters = self.waiters(fileobj)
+        ready = [future for events, future in waiters if events & mask]
+        self.update_waiters(fileobj, [
+            waiter for waiter in waiters if not waiter[0] & mask])
+        for future in ready:
+            resolve(future, True)
+
+    def expire_deadlines(self):
+        now = time.monotonic()
+        while self.deadlines and self.deadlines[0][0] <= now:
+            _, _, fileobj, future = heapq.heappop(self.deadlines)
+            if future.done():
+                continue
+            self.update_waiters(fileobj, [
+                waiter for waiter in self.waiters(fileobj)
+                if waiter[1] is not future])
+            resolve(future, False)
+
+def resolve(future, result):
+    try:
+        future.set_result(result)
+    except InvalidStateError:
+        pass   # Cancelled by its caller
+
+def fail(future, error):
+    try:
+        future.set_exception(error)
+    except InvalidStateError:
+        pass
+
+
+# Example 18:  Hundreds of slow system calls overlap with the helicopter computation using one
+# extra thread instead of hundreds.   Each wait is on one end of a socketpair that never receives
+# data, so it runs until its timeout like slow_systemcall.   One more socketpair shows a wait that
+# completes because data arrives, reported through a callback instead of a blocking result().
+multiplexer = Multiplexer()
+multiplexer.start()
+
+start = time.time()
+
+pairs = [socket.socketpair() for _ in range(400)]
+futures = [multiplexer.wait_readable(a, timeout=0.1) for a, _ in pairs]
+
+reader, writer = socket.socketpair()
+ready_future = multiplexer.wait_readable(reader, timeout=1)
+callback_results = []
+callback_done = threading.Event()
+
+def on_ready(future):
+    callback_results.append(future.result())
+    callback_done.set()
+
+ready_future.add_done_callback(on_ready)
+writer.send(b'hello')
+
+for i in range(5):
+    compute_helicopter_location(i)
+
+timed_out = sum(not future.result() for future in futures)
+end = time.time()
+delta = end - start
+print(f'{len(futures)} waits ({timed_out} timed out) took {delta:.3f} seconds '
+      f'with {threading.active_count()} threads')
+
+callback_done.wait()
+print('socketpair ready:', callback_results)
+
+# Two waits on the same socket both resolve, and a wait on a closed socket fails on its own.
+reader2, writer2 = socket.socketpair()
+shared = [multiplexer.wait_readable(reader2, timeout=0.1) for _ in range(2)]
+closed, closed_peer = socket.socketpair()
+closed.close()
+failed = multiplexer.wait_readable(closed, timeout=0.1)
+assert [future.result() for future in shared] == [False, False]
+assert isinstance(failed.exception(), ValueError)
+
+# A cancelled wait leaves the selector, so a new socket that reuses its fd can be waited on.
+old_reader, old_writer = socket.socketpair()
+multiplexer.wait_readable(old_reader).cancel()
+old_reader.close()
+old_writer.close()
+new_reader, new_writer = socket.socketpair()
+new_writer.send(b'x')
+assert multiplexer.wait_readable(new_reader, timeout=1).result() is True
+new_reader.close()
+new_writer.close()
+writer2.send(b'x')
+assert multiplexer.wait_readable(reader2, timeout=1).result() is True
+reader2.close()
+writer2.close()
+closed_peer.close()
+multiplexer.stop()
+for a, b in pairs + [(reader, writer)]:
+    a.close()
+    b.close()
@@ -145,4 +145,168 @@ for thread in threads:
 
 expected = how_many * 5
 found = counter.count
-print(f'Counter should be {expected}, got {found}')
\ No newline at end of file
+print(f'Counter should be {expected}, got {found}')
+
+# Example 9:  LockingCounter is correct, but every increment from every sensor thread takes the same
+# Lock, so the threads queue up on one mutex.   ShardedCounter gives each thread its own shard
+# through threading.local and adds the shards up when we read.   Only the owning thread ever writes
+# to a shard, so the read-modify-write in increment can't race with another writer and needs no
+# Lock; other threads only read the shards.
+#
+# exact_value sums every shard now, so it includes every increment that finished before the call.
+# value is the fast, eventually consistent read: it returns a total cached for up to max_staleness
+# seconds, so frequent readers don't pay for summing all the shards every time.
+import threading
+import time
+
+class ShardedCounter:
+    def __init__(self, max_staleness=0.1):
+        self.local = threading.local()
+        self.shards = []
+        self.shards_lock = Lock()   # Only used when a thread adds its shard
+        self.max_staleness = max_staleness
+        self.cached = (0, float('-inf'))   # (total, time it was summed)
+
+    def increment(self, offset):
+        try:
+            shard = self.local.shard
+        except AttributeError:
+            shard = self.local.shard = [0]
+            with self.shards_lock:
+                self.shards.append(shard)
+        shard[0] += offset
+
+    def exact_value(self):
+        with self.shards_lock:
+            shards = list(self.shards)
+        total = sum(shard[0] for shard in shards)
+        self.cached = (total, time.monotonic())
+        return total
+
+    def value(self):
+        total, when = self.cached
+        if time.monotonic() - when > self.max_staleness:
+            return self.exact_value()
+        return total
+
+    @property
+    def count(self):
+        return self.exact_value()
+
+
+# Example 10:  ShardedCounter gets the right answer with the same worker and Barrier harness.
+# Then we time all three counters with it.   Counter is fast but wrong; the other two are correct.
+def run_counter(counter_class, thread_count=5):
+    global BARRIER
+    BARRIER = Barrier(thread_count)
+    counter = counter_class()
+    threads = []
+    for i in range(thread_count):
+        thread = Thread(target=worker,
+                        args=(i, how_many, counter))
+        threads.append(thread)
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+    return counter
+
+for counter_class in (Counter, LockingCounter, ShardedCounter):
+    start = time.time()
+    counter = run_counter(counter_class)
+    end = time.time()
+    delta = end - start
+    print(f'{counter_class.__name__:<15} counted {counter.count} '
+          f'of {how_many * 5} in {delta:.3f} seconds')
+
+
+# Example 11:  Threads share one process, but for multi-process sensor ingestion the counter has to
+# live in memory every process can see.   SharedMemoryCounter keeps one 64-bit count per process
+# in multiprocessing.shared_memory.   Each slot is padded to a 64-byte cache line, so two processes
+# incrementing neighboring slots don't keep stealing the same cache line from each other.   Each
+# process writes only its own slot, so increments need no Lock and no IPC; a reader sums the slots.
+import multiprocessing
+from multiprocessing import shared_memory
+
+class CounterSlot:
+    def __init__(self, counts, index):
+        self.counts = counts
+        self.index = index
+
+    def increment(self, offset):
+        self.counts[self.index] += offset
+
+class SharedMemoryCounter:
+    CACHE_LINE = 64
+    STRIDE = CACHE_LINE // 8   # 8-byte counts per cache line
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=slots * self.CACHE_LINE)
+        self.counts = self.memory.buf.cast('q')
+        for i in range(slots):
+            self.counts[i * self.STRIDE] = 0
+
+    def for_slot(self, slot):
+        # Give this to the process that owns the slot.
+        return CounterSlot(self.counts, slot * self.STRIDE)
+
+    @property
+    def count(self):
+        return sum(self.counts[::self.STRIDE])
+
+    def close(self):
+        self.counts.release()
+        self.memory.close()
+        self.memory.unlink()
+
+
+# Example 12:  The same worker function runs in five processes.   Like the threaded examples a
+# Barrier lines them up before they start counting; it has to be a multiprocessing Barrier, and
+# the fork start method lets the children see it and the worker function.   The threads from the
+# earlier examples have all been joined, so no child is forked while another thread holds a lock.
+# Windows has no fork, so the processes are skipped there.   For comparison, multiprocessing.Value
+# takes a cross-process lock on every increment.
+class ValueCounter:
+    def __init__(self, context):
+        self.value = context.Value('q', 0)
+
+    def increment(self, offset):
+        with self.value.get_lock():
+            self.value.value += offset
+
+    @property
+    def count(self):
+        return self.value.value
+
+def run_processes(counter, bind, process_count=5):
+    global BARRIER
+    BARRIER = context.Barrier(process_count)
+    processes = []
+    for i in range(process_count):
+        process = context.Process(target=worker,
+                                  args=(i, how_many, bind(counter, i)))
+        processes.append(process)
+        process.start()
+
+    for process in processes:
+        process.join()
+
+if os.name == 'nt':
+    print("This example doesn't work on Windows")
+else:
+    context = multiprocessing.get_context('fork')
+    counters = [
+        (ValueCounter(context), lambda counter, i: counter),
+        (SharedMemoryCounter(5), lambda counter, i: counter.for_slot(i)),
+    ]
+    for counter, bind in counters:
+        start = time.time()
+        run_processes(counter, bind)
+        end = time.time()
+        delta = end - start
+        print(f'{type(counter).__name__:<19} counted {counter.count} '
+              f'of {how_many * 5} in {delta:.3f} seconds')
+
+    counters[1][0].close()
@@ -344,4 +344,750 @@ stop_threads(download_queue, download_threads)
 stop_threads(resize_queue, resize_threads)
 stop_threads(upload_queue, upload_threads)
 
-print(done_queue.qsize(), 'items finished')
\ No newline at end of file
+print(done_queue.qsize(), 'items finished')
+
+# Example 25:  Wiring the pipeline by hand means one queue per phase, start_threads and stop_threads
+# calls in the right order, and a fixed worker count per phase.   A Pipeline object does this for
+# us.   Each stage is declared with a function, a worker count and a queue size; bounded queues
+# keep a slow stage from letting work pile up in memory.   TimedWorker records how long each call
+# takes so the pipeline can tell which stage is the slow one.
+class TimedWorker(StoppableWorker):
+    def __init__(self, stage, out_queue):
+        super().__init__(stage.func, stage.in_queue, out_queue)
+        self.stage = stage
+
+    def run(self):
+        for item in self.in_queue:
+            start = time.perf_counter()
+            result = self.func(item)
+            self.stage.record(time.perf_counter() - start)
+            self.out_queue.put(result)
+
+class Stage:
+    def __init__(self, func, workers=1, max_size=0,
+                 min_workers=None, max_workers=None):
+        self.func = func
+        self.workers = workers
+        self.min_workers = min_workers or workers
+        self.max_workers = max_workers or workers
+        self.in_queue = ClosableQueue(max_size)
+        self.threads = []
+        self.lock = Lock()
+        self.service_time = 0.0   # Running average in seconds
+
+    def record(self, elapsed):
+        with self.lock:
+            self.service_time = 0.9 * self.service_time + 0.1 * elapsed
+
+
+# Example 26:  Shutdown happens in stage order: a stage is closed only once every stage before it
+# has drained, so no item is lost.   This is the same sequence as Example 24.
+class Pipeline:
+    def __init__(self, autoscale=False, scale_interval=0.02):
+        self.stages = []
+        self.done_queue = ClosableQueue()
+        self.autoscale = autoscale
+        self.scale_interval = scale_interval
+        self.scaler = None
+        self.stopping = False
+
+    def add_stage(self, func, workers=1, max_size=0,
+                  min_workers=None, max_workers=None):
+        self.stages.append(Stage(func, workers, max_size,
+                                 min_workers, max_workers))
+        return self
+
+    def out_queue(self, stage):
+        index = self.stages.index(stage)
+        if index + 1 < len(self.stages):
+            return self.stages[index + 1].in_queue
+        return self.done_queue
+
+    def start_worker(self, stage):
+        thread = TimedWorker(stage, self.out_queue(stage))
+        thread.start()
+        stage.threads.append(thread)
+
+    def start(self):
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                self.start_worker(stage)
+        if self.autoscale:
+            self.scaler = Thread(target=self.scale_loop)
+            self.scaler.start()
+        return self
+
+    def put(self, item):
+        self.stages[0].in_queue.put(item)
+
+    def close(self):
+        self.stopping = True
+        if self.scaler is not None:
+            self.scaler.join()
+        for stage in self.stages:
+            stop_threads(stage.in_queue, stage.threads)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *_):
+        self.close()
+
+
+# Example 27:  In autoscaling mode a monitor thread adds a worker to a stage when its backlog would
+# take longer than scale_interval to clear at the measured service time, and retires a worker when
+# the stage's queue is empty.   Worker counts stay within min_workers and max_workers, so the
+# pipeline settles at the throughput of its slowest stage without hand tuning.   A worker is
+# retired by sending it a SENTINEL; the monitor waits for that worker to exit so stop_threads
+# later sends exactly one SENTINEL per remaining worker.
+    def scale_loop(self):
+        while not self.stopping:
+            time.sleep(self.scale_interval)
+            for stage in self.stages:
+                self.scale(stage)
+
+    def scale(self, stage):
+        backlog = stage.in_queue.qsize()
+        count = len(stage.threads)
+        drain_time = backlog * stage.service_time / count
+        if drain_time > self.scale_interval and count < stage.max_workers:
+            self.start_worker(stage)
+        elif backlog == 0 and count > stage.min_workers:
+            self.retire_worker(stage)
+
+    def retire_worker(self, stage):
+        stage.in_queue.close()
+        while True:
+            for thread in stage.threads:
+                thread.join(0.001)
+                if not thread.is_alive():
+                    stage.threads.remove(thread)
+                    return
+
+
+# Example 28:  Now the whole download, resize, upload pipeline is declared in one place.   Here
+# resize is the slowest stage; the fixed pipeline is limited by its single resize worker while
+# the autoscaling pipeline grows that stage until the bottleneck moves.
+def slow_download(item):
+    time.sleep(0.001)
+    return item
+
+def slow_resize(item):
+    time.sleep(0.005)
+    return item
+
+def slow_upload(item):
+    time.sleep(0.002)
+    return item
+
+for autoscale in (False, True):
+    pipeline = Pipeline(autoscale=autoscale)
+    pipeline.add_stage(slow_download, 1, max_size=50, max_workers=4)
+    pipeline.add_stage(slow_resize, 1, max_size=50, max_workers=8)
+    pipeline.add_stage(slow_upload, 1, max_size=50, max_workers=4)
+
+    start = time.perf_counter()
+    with pipeline:
+        for _ in range(300):
+            pipeline.put(object())
+        workers = [len(stage.threads) for stage in pipeline.stages]
+    delta = time.perf_counter() - start
+    print(f'autoscale={autoscale}: {pipeline.done_queue.qsize()} items '
+          f'in {delta:.3f} seconds, workers {workers}')
+
+
+# Example 29:  ClosableQueue moves one item at a time.   Every get and put takes the Queue mutex
+# and notifies a condition, and task_done takes it again.   When the work per item is tiny, like
+# resize, that lock traffic dominates.   BatchQueue adds put_many and get_many, which move many
+# items under one acquisition of the mutex, and task_done_many, which marks them all done at once.
+# A batch never extends past a SENTINEL, so each close call still stops exactly one worker and
+# join still waits for every item, SENTINELs included.
+from queue import Empty
+
+class BatchQueue(ClosableQueue):
+    def put_many(self, items):
+        items = list(items)
+        with self.not_full:
+            while items:
+                if self.maxsize > 0:
+                    while self._qsize() >= self.maxsize:
+                        self.not_full.wait()
+                    room = self.maxsize - self._qsize()
+                else:
+                    room = len(items)
+                batch, items = items[:room], items[room:]
+                for item in batch:
+                    self._put(item)
+                self.unfinished_tasks += len(batch)
+                self.not_empty.notify(len(batch))
+
+    def get_many(self, max_n, timeout=None):
+        with self.not_empty:
+            if not self.not_empty.wait_for(self._qsize, timeout):
+                raise Empty
+            batch = []
+            while self._qsize() and len(batch) < max_n:
+                item = self._get()
+                batch.append(item)
+                if item is self.SENTINEL:
+                    break
+            self.not_full.notify(len(batch))
+            return batch
+
+    def task_done_many(self, count):
+        with self.all_tasks_done:
+            unfinished = self.unfinished_tasks - count
+            if unfinished < 0:
+                raise ValueError('task_done() called too many times')
+            if unfinished == 0:
+                self.all_tasks_done.notify_all()
+            self.unfinished_tasks = unfinished
+
+
+# Example 30:  The batch version of __iter__ yields lists, and BatchWorker calls the stage function
+# on a whole list.   The stage function returns a list of results.
+    def iter_batches(self, max_n):
+        while True:
+            batch = self.get_many(max_n)
+            try:
+                if batch[-1] is self.SENTINEL:
+                    if len(batch) > 1:
+                        yield batch[:-1]
+                    return  # Cause the thread to exit
+                yield batch
+            finally:
+                self.task_done_many(len(batch))
+
+class BatchWorker(StoppableWorker):
+    def __init__(self, func, in_queue, out_queue, max_n=256):
+        super().__init__(func, in_queue, out_queue)
+        self.max_n = max_n
+
+    def run(self):
+        for batch in self.in_queue.iter_batches(self.max_n):
+            self.out_queue.put_many(self.func(batch))
+
+def resize_many(items):
+    return [resize(item) for item in items]
+
+def start_batch_threads(count, *args):
+    threads = [BatchWorker(*args) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+# Example 31:  The same resize stage with four workers and the same close/join sequence as
+# Example 24, one item at a time and then in batches.
+ITEM_COUNT = 100_000
+
+resize_queue = ClosableQueue()
+done_queue = ClosableQueue()
+start = time.perf_counter()
+resize_threads = start_threads(4, resize, resize_queue, done_queue)
+for _ in range(ITEM_COUNT):
+    resize_queue.put(object())
+stop_threads(resize_queue, resize_threads)
+delta = time.perf_counter() - start
+print(f'One at a time: {done_queue.qsize()} items in {delta:.3f} seconds')
+
+resize_queue = BatchQueue()
+done_queue = BatchQueue()
+start = time.perf_counter()
+resize_threads = start_batch_threads(4, resize_many, resize_queue, done_queue)
+resize_queue.put_many(object() for _ in range(ITEM_COUNT))
+stop_threads(resize_queue, resize_threads)
+delta = time.perf_counter() - start
+print(f'Batched:       {done_queue.qsize()} items in {delta:.3f} seconds')
+
+
+# Example 32:  Every stage so far is a Thread, so a CPU-bound resize is serialized by the GIL.   A
+# process stage runs its function in a ProcessPoolExecutor instead.   Rather than pickling every
+# item across to the child, each stage owns a block of shared memory split into one slot per
+# worker.   The parent copies an item into its slot, the child reads it in place, writes the result
+# back into the same slot and returns only its length.   The child keeps its attachments to shared
+# memory in ATTACHED so it only opens each block once.   The stage function receives a memoryview
+# and returns bytes.   Items or results that don't fit in a slot are pickled instead.
+#
+# This example relies on the fork start method so the child processes can see functions defined
+# in this script (see Item 64 for putting them in a module instead).   Forking a process that
+# already runs threads can deadlock the child, so the pipeline starts every child process before
+# it starts any stage thread.   Windows has no fork, so the process examples are skipped there.
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+ATTACHED = {}
+
+def run_in_shared_memory(func, name, offset, size, slot_size):
+    memory = ATTACHED.get(name)
+    if memory is None:
+        memory = shared_memory.SharedMemory(name=name)
+        ATTACHED[name] = memory
+    with memory.buf[offset:offset + slot_size] as slot:
+        with slot[:size] as data:
+            result = func(data)
+        if len(result) > slot_size:
+            return bytes(result)   # Too big for the slot, so it is pickled back
+        slot[:len(result)] = result
+    return len(result)
+
+
+# Example 33:  ProcessWorker is still a thread that iterates a ClosableQueue, so process stages use
+# the same close/join lifecycle as thread stages.   The thread only waits on the child, so it
+# releases the GIL for other stages while the work runs in parallel.
+class ProcessStage(Stage):
+    def __init__(self, func, workers=1, max_size=0, min_workers=None,
+                 max_workers=None, slot_size=1024 * 1024):
+        super().__init__(func, workers, max_size, min_workers, max_workers)
+        self.slot_size = slot_size
+        self.memory = None
+        self.free_slots = Queue()
+
+    def open(self):
+        size = self.max_workers * self.slot_size
+        self.memory = shared_memory.SharedMemory(create=True, size=size)
+        for slot in range(self.max_workers):
+            self.free_slots.put(slot)
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+class ProcessWorker(TimedWorker):
+    def __init__(self, stage, out_queue, pool):
+        super().__init__(stage, out_queue)
+        self.pool = pool
+
+    def run(self):
+        stage = self.stage
+        slot = stage.free_slots.get()
+        offset = slot * stage.slot_size
+        try:
+            for item in self.in_queue:
+                start = time.perf_counter()
+                try:
+                    result = self.process(item, offset)
+                except Exception:
+                    # Dying here would leave this worker's SENTINEL in the
+                    # queue and hang stop_threads, so drop the item instead.
+                    logging.exception('Process stage failed on an item')
+                    continue
+                stage.record(time.perf_counter() - start)
+                self.out_queue.put(result)
+        finally:
+            stage.free_slots.put(slot)
+
+    def process(self, item, offset):
+        stage = self.stage
+        if len(item) > stage.slot_size:
+            return self.pool.submit(stage.func, bytes(item)).result()
+        stage.memory.buf[offset:offset + len(item)] = item
+        future = self.pool.submit(
+            run_in_shared_memory, stage.func, stage.memory.name,
+            offset, len(item), stage.slot_size)
+        size = future.result()
+        if not isinstance(size, int):
+            return size
+        return bytes(stage.memory.buf[offset:offset + size])
+
+
+# Example 34:  MixedPipeline accepts kind='process' on any stage, so thread and process stages mix
+# freely.   The pool is sized for the most process workers that can run at once, and start warms
+# it up the way Item 64's WarmPool does: one task per worker makes the executor fork them all
+# now, from this thread, instead of later from inside a ProcessWorker thread.
+class MixedPipeline(Pipeline):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = None
+
+    def add_stage(self, func, workers=1, max_size=0, min_workers=None,
+                  max_workers=None, kind='thread', slot_size=1024 * 1024):
+        if kind == 'process':
+            self.stages.append(ProcessStage(func, workers, max_size,
+                                            min_workers, max_workers,
+                                            slot_size))
+            return self
+        return super().add_stage(func, workers, max_size,
+                                 min_workers, max_workers)
+
+    def process_stages(self):
+        return [s for s in self.stages if isinstance(s, ProcessStage)]
+
+    def start(self):
+        stages = self.process_stages()
+        if stages:
+            # Open the shared memory first so the children share the
+            # parent's resource tracker instead of each starting their own.
+            for stage in stages:
+                stage.open()
+            context = multiprocessing.get_context('fork')
+            max_workers = sum(stage.max_workers for stage in stages)
+            self.pool = ProcessPoolExecutor(max_workers, mp_context=context)
+            self.warm_up(max_workers)
+        return super().start()
+
+    def warm_up(self, max_workers):
+        futures = [self.pool.submit(os.getpid) for _ in range(max_workers)]
+        for future in futures:
+            future.result()
+
+    def start_worker(self, stage):
+        if not isinstance(stage, ProcessStage):
+            return super().start_worker(stage)
+        thread = ProcessWorker(stage, self.out_queue(stage), self.pool)
+        thread.start()
+        stage.threads.append(thread)
+
+    def close(self):
+        super().close()
+        if self.pool is not None:
+            self.pool.shutdown()
+            for stage in self.process_stages():
+                stage.close()
+
+
+# Example 35:  A CPU-bound resize that halves an image by averaging neighboring bytes.   With a
+# thread stage the four workers take turns holding the GIL; with a process stage they run on
+# separate cores.
+def cpu_resize(data):
+    return bytes((data[i] + data[i + 1]) // 2
+                 for i in range(0, len(data) - 1, 2))
+
+images = [random.randbytes(200_000) for _ in range(32)]
+expected = [cpu_resize(image) for image in images[:2]]
+
+if os.name == 'nt':
+    print("The process stage examples don't work on Windows")
+    kinds = ('thread',)
+else:
+    kinds = ('thread', 'process')
+
+for kind in kinds:
+    pipeline = MixedPipeline()
+    pipeline.add_stage(download, 1)
+    pipeline.add_stage(cpu_resize, 4, max_size=8, kind=kind)
+    pipeline.add_stage(upload, 1)
+
+    start = time.perf_counter()
+    with pipeline:
+        for image in images:
+            pipeline.put(image)
+    delta = time.perf_counter() - start
+
+    results = list(pipeline.done_queue.queue)
+    assert len(results) == len(images)
+    assert all(result in results for result in expected)
+    print(f'{kind} resize stage: {len(results)} images '
+          f'in {delta:.3f} seconds')
+
+# Items bigger than the slot are pickled rather than overrunning the next worker's slot, results
+# that don't fit come back the same way, and an item the function fails on is logged and dropped
+# without stopping its worker.
+def repeat_twice(data):
+    if data[:1] == b'!':
+        raise ValueError('Cannot repeat this item')
+    return bytes(data) * 2
+
+if 'process' in kinds:
+    pipeline = MixedPipeline()
+    pipeline.add_stage(repeat_twice, 2, kind='process', slot_size=16)
+    with pipeline:
+        for item in (b'a' * 4, b'b' * 12, b'c' * 20, b'd' * 40, b'!'):
+            pipeline.put(item)
+
+    results = sorted(pipeline.done_queue.queue)
+    assert results == [b'a' * 8, b'b' * 24, b'c' * 40, b'd' * 80], results
+
+
+# Example 36:  The polling Worker counted polled_count and work_done, but StoppableWorker gives us
+# no visibility at all.   To find the bottleneck stage in production we need a few cheap numbers
+# per stage.   Histogram keeps counts in fixed power-of-two buckets from 1 microsecond to about
+# 8 seconds, so recording a value is one bisect and memory never grows.   Percentiles are reported
+# as the upper bound of the bucket they fall in.
+import json
+from bisect import bisect_left
+
+class Histogram:
+    BOUNDS = [1e-6 * 2 ** i for i in range(24)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.lock = Lock()
+
+    def record(self, value):
+        index = bisect_left(self.BOUNDS, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def percentile(self, fraction):
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return self.BOUNDS[min(index, len(self.BOUNDS) - 1)]
+        return 0.0
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+        }
+
+
+# Example 37:  Items travel between stages in an envelope with the time they entered the pipeline,
+# so the last stage can record end-to-end latency before it puts the bare result in done_queue.
+# Each stage's histogram total is its busy time; dividing by the worker-seconds it had available
+# gives its utilization.
+class MeteredWorker(TimedWorker):
+    def __init__(self, stage, out_queue, latency):
+        super().__init__(stage, out_queue)
+        self.latency = latency   # None except in the last stage
+
+    def run(self):
+        for entered, item in self.in_queue:
+            start = time.perf_counter()
+            result = self.func(item)
+            end = time.perf_counter()
+            self.stage.service.record(end - start)
+            self.stage.record(end - start)   # Feeds autoscaling
+            if self.latency is None:
+                self.out_queue.put((entered, result))
+            else:
+                self.latency.record(end - entered)
+                self.out_queue.put(result)
+
+
+# Example 38:  MeteredPipeline samples every stage's queue depth from a reporter thread.   The
+# samples go into a bounded deque so a long-running pipeline uses fixed memory.   snapshot returns
+# everything as a dict, and snapshot_json is ready to serve from a status endpoint or log.
+class MeteredPipeline(Pipeline):
+    def __init__(self, report_interval=0.1, report_func=None,
+                 depth_samples=600, **kwargs):
+        super().__init__(**kwargs)
+        self.report_interval = report_interval
+        self.report_func = report_func
+        self.depth_samples = depth_samples
+        self.latency = Histogram()
+        self.reporter = None
+        self.reporting = False
+
+    def start(self):
+        for stage in self.stages:
+            stage.service = Histogram()
+            stage.depths = deque(maxlen=self.depth_samples)
+            stage.worker_seconds = 0.0
+        self.started = time.perf_counter()
+        super().start()
+        self.reporting = True
+        self.reporter = Thread(target=self.report_loop)
+        self.reporter.start()
+        return self
+
+    def start_worker(self, stage):
+        last = stage is self.stages[-1]
+        latency = self.latency if last else None
+        thread = MeteredWorker(stage, self.out_queue(stage), latency)
+        thread.start()
+        stage.threads.append(thread)
+
+    def put(self, item):
+        super().put((time.perf_counter(), item))
+
+    def close(self):
+        super().close()
+        self.reporting = False
+        self.reporter.join()
+
+    def report_loop(self):
+        last = time.perf_counter()
+        while self.reporting:
+            time.sleep(self.report_interval)
+            now = time.perf_counter()
+            for stage in self.stages:
+                stage.depths.append(stage.in_queue.qsize())
+                stage.worker_seconds += len(stage.threads) * (now - last)
+            last = now
+            if self.report_func is not None:
+                self.report_func(self.snapshot())
+
+    def snapshot(self):
+        stages = []
+        for stage in self.stages:
+            depths = list(stage.depths)
+            busy = stage.service.total
+            stages.append({
+                'name': stage.func.__name__,
+                'workers': len(stage.threads),
+                'queue_depth': depths[-1] if depths else 0,
+                'max_queue_depth': max(depths, default=0),
+                'service_time': stage.service.to_dict(),
+                'utilization': busy / stage.worker_seconds
+                               if stage.worker_seconds else 0.0,
+            })
+        return {
+            'uptime': time.perf_counter() - self.started,
+            'latency': self.latency.to_dict(),
+            'stages': stages,
+        }
+
+    def snapshot_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+
+# Example 39:  The reporter prints the busiest stage on every tick, and the final snapshot shows
+# resize is the bottleneck: its queue backs up and its workers are busy nearly all the time.
+def print_bottleneck(snapshot):
+    busiest = max(snapshot['stages'], key=lambda s: s['utilization'])
+    print(f'{snapshot["uptime"]:.1f}s: bottleneck {busiest["name"]} '
+          f'utilization {busiest["utilization"]:.0%} '
+          f'depth {busiest["queue_depth"]}')
+
+pipeline = MeteredPipeline(report_interval=0.2, report_func=print_bottleneck)
+pipeline.add_stage(slow_download, 2)
+pipeline.add_stage(slow_resize, 2)
+pipeline.add_stage(slow_upload, 2)
+
+with pipeline:
+    for _ in range(200):
+        pipeline.put(object())
+
+print(pipeline.done_queue.qsize(), 'items finished')
+print(pipeline.snapshot_json())
+
+# Metering keeps the running service time up to date, so autoscaling still works.
+pipeline = MeteredPipeline(report_interval=0.2, autoscale=True)
+pipeline.add_stage(slow_download, 2)
+pipeline.add_stage(slow_resize, 1, max_workers=4)
+pipeline.add_stage(slow_upload, 2)
+
+with pipeline:
+    for _ in range(200):
+        pipeline.put(object())
+    resize_stage = pipeline.stages[1]
+    peak_workers = 1
+    while resize_stage.in_queue.qsize() or pipeline.stages[0].in_queue.qsize():
+        peak_workers = max(peak_workers, len(resize_stage.threads))
+        time.sleep(0.01)
+    assert resize_stage.service_time > 0
+
+print(f'Metered autoscale: resize grew to {peak_workers} workers')
+assert peak_workers > 1
+
+
+# Example 40:  Items 60 to 63 move I/O to coroutines, but this pipeline still needs a thread per
+# worker.   AsyncClosableQueue is the asyncio version of ClosableQueue: close puts a SENTINEL and
+# iterating with async for stops when it arrives, calling task_done for every item so join works.
+import asyncio
+import inspect
+
+class AsyncClosableQueue(asyncio.Queue):
+    SENTINEL = object()
+
+    async def close(self):
+        await self.put(self.SENTINEL)
+
+    async def __aiter__(self):
+        while True:
+            item = await self.get()
+            try:
+                if item is self.SENTINEL:
+                    return  # Cause the worker to exit
+                yield item
+            finally:
+                self.task_done()
+
+
+# Example 41:  AsyncPipeline has the same add_stage API as Pipeline.   A stage function can be a
+# coroutine, which is awaited, or a blocking function, which is run in an executor (the default
+# thread pool unless the stage names one).   Workers are tasks, not threads, so an I/O-bound stage
+# can have thousands of them.   Bounded queues apply backpressure: put waits while the first
+# stage's queue is full.
+async def stoppable_worker(func, in_queue, out_queue, executor):
+    loop = asyncio.get_running_loop()
+    async for item in in_queue:
+        if inspect.iscoroutinefunction(func):
+            result = await func(item)
+        else:
+            result = await loop.run_in_executor(executor, func, item)
+        await out_queue.put(result)
+
+class AsyncStage:
+    def __init__(self, func, workers=1, max_size=0, executor=None):
+        self.func = func
+        self.workers = workers
+        self.executor = executor
+        self.in_queue = AsyncClosableQueue(max_size)
+        self.tasks = []
+
+class AsyncPipeline:
+    def __init__(self):
+        self.stages = []
+        self.done_queue = AsyncClosableQueue()
+
+    def add_stage(self, func, workers=1, max_size=0, executor=None):
+        self.stages.append(AsyncStage(func, workers, max_size, executor))
+        return self
+
+    async def start(self):
+        out_queues = [s.in_queue for s in self.stages[1:]] + [self.done_queue]
+        for stage, out_queue in zip(self.stages, out_queues):
+            for _ in range(stage.workers):
+                coro = stoppable_worker(stage.func, stage.in_queue,
+                                        out_queue, stage.executor)
+                stage.tasks.append(asyncio.create_task(coro))
+        return self
+
+    async def put(self, item):
+        await self.stages[0].in_queue.put(item)
+
+    async def close(self):
+        # The same sequence as stop_threads, one stage at a time.
+        for stage in self.stages:
+            for _ in stage.tasks:
+                await stage.in_queue.close()
+            await stage.in_queue.join()
+            await asyncio.gather(*stage.tasks)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+
+# Example 42:  download and upload are I/O-bound coroutines with ten thousand workers each, so
+# tens of thousands of items are in flight at once.   resize is an ordinary blocking function and
+# runs in the default executor.
+async def download_async(item):
+    await asyncio.sleep(0.1)   # Simulated network I/O
+    return item
+
+async def upload_async(item):
+    await asyncio.sleep(0.1)
+    return item
+
+async def run_async_pipeline(count):
+    pipeline = AsyncPipeline()
+    pipeline.add_stage(download_async, 10_000, max_size=10_000)
+    pipeline.add_stage(resize, 4, max_size=1_000)
+    pipeline.add_stage(upload_async, 10_000, max_size=10_000)
+
+    async with pipeline:
+        for _ in range(count):
+            await pipeline.put(object())
+
+    return pipeline.done_queue.qsize()
+
+start = time.perf_counter()
+finished = asyncio.run(run_async_pipeline(20_000))
+delta = time.perf_counter() - start
+print(f'{finished} items finished in {delta:.3f} seconds')
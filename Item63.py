@@ -258,4 +258,803 @@ confirm_merge(input_paths, output_path)
 tmpdir.cleanup()
 
 
-print(10*'*', 'Got the the end', 10*'*')
\ No newline at end of file
+print(10*'*', 'Got the the end', 10*'*')
+
+# Example 10:  WriteThread schedules one run_coroutine_threadsafe round trip and one output.write
+# call per line.   With many tailers this overhead dominates.   A faster writer coalesces lines into
+# large buffers and hands them to the operating system with os.writev, which writes a whole batch
+# in a single system call.   os.writev may write only part of the data, so we keep going until
+# everything is written.   Platforms without os.writev get a single joined write.
+from collections import deque
+
+IOV_MAX = os.sysconf('SC_IOV_MAX') if hasattr(os, 'sysconf') else 1024
+
+def write_all(fd, chunks):
+    if not hasattr(os, 'writev'):
+        data = memoryview(b''.join(chunks))
+        while data:
+            data = data[os.write(fd, data):]
+        return
+
+    chunks = deque(memoryview(chunk) for chunk in chunks if chunk)
+    while chunks:
+        batch = [chunks[i] for i in range(min(len(chunks), IOV_MAX))]
+        written = os.writev(fd, batch)
+        while written:
+            size = len(chunks[0])
+            if written >= size:
+                written -= size
+                chunks.popleft()
+            else:
+                chunks[0] = chunks[0][written:]
+                written = 0
+
+def resolve_future(future):
+    if not future.done():
+        future.set_result(None)
+
+def fail_future(future, error):
+    if not future.done():
+        future.set_exception(error)
+
+
+# Example 11:  The writer thread takes lines through a deque (append and popleft are atomic, so
+# no Lock is needed) and an Event that wakes it up.   The buffer is flushed when it reaches
+# flush_size bytes or when flush_interval seconds have passed.   A failed write or fsync (ENOSPC,
+# EIO) fails the write_durable futures of that batch with the error, and the thread keeps going
+# in case the disk recovers.   If the thread itself dies, every waiting and later write_durable
+# call gets the error instead of waiting forever.
+from threading import Event
+
+class BufferedWriteThread(Thread):
+    def __init__(self, output_path, flush_size=64 * 1024,
+                 flush_interval=0.05, mode='wb'):
+        super().__init__()
+        self.output_path = output_path
+        self.mode = mode
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.pending = deque()   # (data, waiter) pairs
+        self.buffered = 0        # Approximate count of unflushed bytes
+        self.wakeup = Event()
+        self.stopping = False
+        self.flush_count = 0
+        self.error = None
+
+    def run(self):
+        try:
+            with open(self.output_path, self.mode, buffering=0) as output:
+                fd = output.fileno()
+                while True:
+                    self.wakeup.wait(self.flush_interval)
+                    self.wakeup.clear()
+                    stopping = self.stopping  # Read before draining
+                    self.flush(fd, final=stopping)
+                    if stopping:
+                        break
+        except Exception as e:
+            self.error = e
+            logging.exception('Writer thread failed')
+            self.fail_pending(e)
+
+    def fail_pending(self, error):
+        while self.pending:
+            _, waiter = self.pending.popleft()
+            if waiter is not None:
+                loop, future = waiter
+                loop.call_soon_threadsafe(fail_future, future, error)
+
+    def flush(self, fd, final=False):
+        chunks = []
+        waiters = []
+        while self.pending:
+            data, waiter = self.pending.popleft()
+            chunks.append(data)
+            if waiter is not None:
+                waiters.append(waiter)
+
+        force = final or bool(waiters)
+        try:
+            if chunks or force:
+                self.write_chunks(fd, chunks, force)
+            if waiters:
+                os.fsync(fd)
+        except OSError as e:
+            logging.exception('Lost %d buffered writes', len(chunks))
+            for loop, future in waiters:
+                loop.call_soon_threadsafe(fail_future, future, e)
+            return
+        if chunks:
+            self.flush_count += 1
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(resolve_future, future)
+
+    def write_chunks(self, fd, chunks, force):
+        # Subclasses may hold data back until force is true.
+        write_all(fd, chunks)
+
+
+# Example 12:  The coroutine methods keep the same interface as WriteThread so run_fully_async
+# can use either one.   write is fire-and-forget: it returns as soon as the line is queued.
+# write_durable waits until the line has been written and fsync'ed to disk, so only the lines
+# that need durability pay for a future and an fsync.
+    async def write(self, data):
+        self.pending.append((data, None))
+        # Races on this counter only make a flush slightly early or late.
+        self.buffered += len(data)
+        if self.buffered >= self.flush_size:
+            self.buffered = 0
+            self.wakeup.set()
+
+    async def write_durable(self, data):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((data, (loop, future)))
+        self.wakeup.set()
+        if self.error is not None:
+            # The thread is gone, so nothing else will resolve the future
+            fail_future(future, self.error)
+        await future
+
+    async def stop(self):
+        self.stopping = True
+        self.wakeup.set()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.join)
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.start)
+        return self
+
+    async def __aexit__(self, *_):
+        await self.stop()
+
+
+# Example 13:  run_fully_async now takes the writer class so we can swap in the buffered version.
+async def run_fully_async(handles, interval, output_path,
+                          writer_class=WriteThread):
+    async with writer_class(output_path) as output:
+        tasks = []
+        for handle in handles:
+            coro = tail_async(handle, interval, output.write)
+            task = asyncio.create_task(coro)
+            tasks.append(task)
+
+        await asyncio.gather(*tasks)
+
+input_paths = ...
+handles = ...
+output_path = ...
+
+tmpdir, input_paths, handles, output_path = setup()
+
+asyncio.run(run_fully_async(handles, 0.1, output_path,
+                            writer_class=BufferedWriteThread))
+
+confirm_merge(input_paths, output_path)
+
+tmpdir.cleanup()
+
+
+# Example 14:  write_durable only returns after the data reaches the disk.
+async def durable_demo(output_path):
+    async with BufferedWriteThread(output_path) as output:
+        for i in range(3):
+            await output.write(f'line {i}\n'.encode())
+        await output.write(b'')   # Empty chunks are skipped, not written forever
+        await output.write_durable(b'checkpoint\n')
+        with open(output_path, 'rb') as f:
+            print('Durable data on disk:', f.read())
+        print('Flushes so far:', output.flush_count)
+
+with TemporaryDirectory() as tmpdir:
+    asyncio.run(durable_demo(os.path.join(tmpdir, 'durable')))
+
+# A writer that fails, here because its directory doesn't exist, fails write_durable too.
+async def failed_writer_demo(output_path):
+    async with BufferedWriteThread(output_path) as output:
+        try:
+            await asyncio.wait_for(output.write_durable(b'lost\n'), 5)
+        except FileNotFoundError:
+            print('write_durable failed with the writer error')
+
+with TemporaryDirectory() as tmpdir:
+    asyncio.run(failed_writer_demo(os.path.join(tmpdir, 'missing', 'out')))
+
+print(10*'*', 'Got to the end of the buffered writer', 10*'*')
+
+
+# Example 15:  run_fully_async writes lines in arrival order.   ReorderBuffer (see Item 62) is a
+# streaming k-way merge with a bounded reorder window: lines go into a heap keyed by key(line)
+# and the smallest is released once the heap holds more than window lines.   Lines that arrive
+# after a newer line was written are passed straight through and counted as late.
+import heapq
+
+class ReorderBuffer:
+    def __init__(self, key, window=1000):
+        self.key = key
+        self.window = window
+        self.heap = []
+        self.counter = 0        # Breaks ties so lines are never compared
+        self.last_key = None
+        self.late_count = 0
+        self.max_lateness = 0
+
+    def push(self, line):
+        key = self.key(line)
+        if self.last_key is not None and key < self.last_key:
+            self.late_count += 1
+            self.max_lateness = max(self.max_lateness,
+                                    self.last_key - key)
+            return [line]
+
+        heapq.heappush(self.heap, (key, self.counter, line))
+        self.counter += 1
+        ready = []
+        while len(self.heap) > self.window:
+            ready.append(self.pop())
+        return ready
+
+    def pop(self):
+        key, _, line = heapq.heappop(self.heap)
+        self.last_key = key
+        return line
+
+    def drain(self):
+        ready = []
+        while self.heap:
+            ready.append(self.pop())
+        return ready
+
+
+# Example 16:  All the tailers run in the same event loop, so the buffer needs no Lock.   It sits
+# between the tailers and either writer thread.
+async def run_fully_async_ordered(handles, interval, output_path, key,
+                                  window=1000,
+                                  writer_class=BufferedWriteThread):
+    buffer = ReorderBuffer(key, window)
+    async with writer_class(output_path) as output:
+        async def write(data):
+            for line in buffer.push(data):
+                await output.write(line)
+
+        tasks = []
+        for handle in handles:
+            coro = tail_async(handle, interval, write)
+            task = asyncio.create_task(coro)
+            tasks.append(task)
+
+        await asyncio.gather(*tasks)
+
+        for line in buffer.drain():
+            await output.write(line)
+
+    return buffer
+
+
+# Example 17:  The simulated writers put a timestamp at the start of each line.
+def write_timestamped_data(path, write_count, interval):
+    with open(path, 'wb') as f:
+        for i in range(write_count):
+            time.sleep(random.random() * interval)
+            letters = random.choices(
+                string.ascii_lowercase, k=10)
+            data = f'{time.time():.6f} {path}-{i:02}-{"".join(letters)}\n'
+            f.write(data.encode())
+            f.flush()
+
+def start_write_threads(directory, file_count,
+                        target=write_random_data):
+    paths = []
+    for i in range(file_count):
+        path = os.path.join(directory, str(i))
+        with open(path, 'w'):
+            pass
+        paths.append(path)
+        args = (path, 10, 0.1)
+        thread = Thread(target=target, args=args)
+        thread.start()
+    return paths
+
+def setup(target=write_random_data):
+    tmpdir = TemporaryDirectory()
+    input_paths = start_write_threads(tmpdir.name, 5, target)
+
+    handles = []
+    for path in input_paths:
+        handle = open(path, 'rb')
+        handles.append(handle)
+
+    Thread(target=close_all, args=(handles,)).start()
+
+    output_path = os.path.join(tmpdir.name, 'merged')
+    return tmpdir, input_paths, handles, output_path
+
+def timestamp_key(line):
+    return float(line.split(b' ', 1)[0])
+
+
+# Example 18:  Every input line appears in the output, and apart from the late lines the
+# output is in timestamp order.
+def confirm_ordered_merge(input_paths, output_path, key, late_count):
+    expected = []
+    for path in input_paths:
+        with open(path, 'rb') as f:
+            expected.extend(f.readlines())
+
+    with open(output_path, 'rb') as f:
+        found = f.readlines()
+
+    assert sorted(expected) == sorted(found)
+
+    out_of_order = 0
+    last_key = None
+    for line in found:
+        line_key = key(line)
+        if last_key is not None and line_key < last_key:
+            out_of_order += 1
+        else:
+            last_key = line_key
+    assert out_of_order <= late_count, f'{out_of_order} > {late_count}'
+
+tmpdir, input_paths, handles, output_path = setup(write_timestamped_data)
+
+buffer = asyncio.run(run_fully_async_ordered(
+    handles, 0.1, output_path, timestamp_key, window=20))
+
+confirm_ordered_merge(input_paths, output_path, timestamp_key,
+                      buffer.late_count)
+print(f'Late lines: {buffer.late_count}, '
+      f'max lateness: {buffer.max_lateness:.3f} seconds')
+
+tmpdir.cleanup()
+
+
+# Example 19:  When the merger restarts it reopens every input at offset 0 and copies everything
+# again.   Instead we save an (inode, offset, head) checkpoint for each input, where head is a
+# hash of the first bytes already delivered from the file.   The checkpoint file is written to a
+# temporary file, fsync'ed, and moved into place with os.replace, so a crash leaves either the old
+# checkpoint or the new one, never a torn file.
+import hashlib
+import json
+
+HEAD_SIZE = 4096
+
+def file_head(fd, offset):
+    data = os.pread(fd, min(offset, HEAD_SIZE), 0)
+    return hashlib.blake2b(data).hexdigest()
+
+class CheckpointStore:
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return {path: tuple(value)
+                        for path, value in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+
+    def save(self, checkpoints):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(checkpoints, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+
+# Example 20:  On restart a file only resumes from its saved offset if it is still the same file:
+# same inode, at least offset bytes long, and the same head.   The head catches a file that was
+# truncated and then grew past the offset again.   We look for the saved inode first: at the path
+# itself, then as path + '.1', then anywhere in the same directory.   If it turns up under another
+# name the file was rotated, but it may still hold lines appended after the last checkpoint, so we
+# finish it from the saved offset and read the new file from the beginning.   Right after a
+# rotation the new file may not exist yet; a PendingFile stands in for it, and the tailer opens it
+# once it appears.   open_from_checkpoint returns every handle to tail, the current file last.
+def matches_checkpoint(handle, saved):
+    inode, offset, head = saved
+    stat = os.fstat(handle.fileno())
+    return (stat.st_ino == inode and offset <= stat.st_size and
+            file_head(handle.fileno(), offset) == head)
+
+def find_inode(path, inode):
+    directory = os.path.dirname(path) or '.'
+    base = os.path.basename(path)
+    names = [base, base + '.1'] + sorted(os.listdir(directory))
+    for name in names:
+        candidate = os.path.join(directory, name)
+        try:
+            if os.stat(candidate).st_ino == inode:
+                return candidate
+        except FileNotFoundError:
+            continue
+    return None
+
+class PendingFile:
+    def __init__(self, path):
+        self.name = path
+        self.handle = None
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+        if self.handle is not None:
+            self.handle.close()
+
+def open_from_checkpoint(path, checkpoints):
+    handles = []
+    saved = checkpoints.get(path)
+    found = None if saved is None else find_inode(path, saved[0])
+    if found is not None:
+        try:
+            handle = open(found, 'rb')
+        except FileNotFoundError:
+            pass   # Deleted since we found it
+        else:
+            if not matches_checkpoint(handle, saved):
+                handle.close()
+            elif found == path:
+                handle.seek(saved[1])
+                return [handle]
+            else:
+                handle.seek(saved[1])
+                handles.append(handle)
+
+    try:
+        handles.append(open(path, 'rb'))
+    except FileNotFoundError:
+        handles.append(PendingFile(path))
+    return handles
+
+
+# Example 21:  Each tailer records the offset just past every line it hands to the writer, under
+# the path it was opened for, so the rest of a rotated file is saved under the original path.
+# The checkpointer snapshots those offsets, waits on an empty write_durable call (everything queued
+# before it is fsync'ed), and only then saves the snapshot.   A saved offset therefore never gets
+# ahead of the output file: after a crash some lines may be written twice, but none are lost.
+async def tail_async_checkpointed(handle, interval, write_func, offsets,
+                                  path=None):
+    loop = asyncio.get_event_loop()
+    path = path or handle.name
+    fd = handle.fileno()
+    inode = os.fstat(fd).st_ino
+    offset = handle.tell()
+    head = file_head(fd, offset)
+
+    while not handle.closed:
+        try:
+            line = await loop.run_in_executor(
+                None, readline, handle)
+        except NoNewData:
+            await asyncio.sleep(interval)
+        else:
+            if offset < HEAD_SIZE:
+                head = file_head(fd, offset + len(line))
+            offset += len(line)
+            await write_func(line)
+            offsets[path] = (inode, offset, head)
+
+async def save_checkpoints(output, offsets, store):
+    snapshot = dict(offsets)
+    await output.write_durable(b'')
+    store.save(snapshot)
+
+async def checkpoint_periodically(output, offsets, store, interval):
+    while True:
+        await asyncio.sleep(interval)
+        await save_checkpoints(output, offsets, store)
+
+async def drain_rotated(handle, write_func, offsets, path):
+    # A rotated file no longer grows, so stop at its end instead of tailing it
+    loop = asyncio.get_event_loop()
+    fd = handle.fileno()
+    inode = os.fstat(fd).st_ino
+    offset = handle.tell()
+    head = file_head(fd, offset)
+    while not handle.closed:
+        try:
+            line = await loop.run_in_executor(None, readline, handle)
+        except NoNewData:
+            break
+        offset += len(line)
+        await write_func(line)
+        offsets[path] = (inode, offset, head)
+    handle.close()
+
+async def wait_for_file(pending, interval):
+    while not pending.closed:
+        try:
+            handle = open(pending.name, 'rb')
+        except FileNotFoundError:
+            await asyncio.sleep(interval)
+            continue
+        pending.handle = handle
+        if pending.closed:   # Closed while we were opening it
+            handle.close()
+            return None
+        return handle
+    return None
+
+async def tail_path(path, handles, interval, write_func, offsets):
+    *rotated, current = handles
+    for handle in rotated:
+        await drain_rotated(handle, write_func, offsets, path)
+    if isinstance(current, PendingFile):
+        current = await wait_for_file(current, interval)
+        if current is None:
+            return
+    await tail_async_checkpointed(current, interval, write_func, offsets, path)
+
+async def run_resumable(sources, interval, output_path, checkpoint_path,
+                        checkpoint_interval=1.0):
+    # sources maps each input path to its handles from open_from_checkpoint
+    store = CheckpointStore(checkpoint_path)
+    offsets = {}
+    async with BufferedWriteThread(output_path, mode='ab') as output:
+        checkpointer = asyncio.create_task(checkpoint_periodically(
+            output, offsets, store, checkpoint_interval))
+
+        tasks = []
+        for path, handles in sources.items():
+            coro = tail_path(path, handles, interval, output.write, offsets)
+            task = asyncio.create_task(coro)
+            tasks.append(task)
+
+        await asyncio.gather(*tasks)
+
+        checkpointer.cancel()
+        await save_checkpoints(output, offsets, store)
+
+
+# Example 22:  The first run copies five lines from each file.   Then more lines are appended,
+# one file is rotated and another is truncated and grows past its old offset.   The second run
+# reads only the new data, including the lines appended to the rotated file before it was moved
+# aside.   The five lines appended to the truncated file are gone with the truncation.   Before
+# the third run the first file is rotated and its replacement only appears while the merger runs,
+# so the rest of the rotated file is read first and then the new file from its beginning.
+from threading import Timer
+
+def append_lines(path, start, count):
+    with open(path, 'ab') as f:
+        for i in range(start, start + count):
+            f.write(f'{path}-{i:02}\n'.encode())
+
+def run_resumable_once(input_paths, output_path, checkpoint_path):
+    checkpoints = CheckpointStore(checkpoint_path).load()
+    sources = {path: open_from_checkpoint(path, checkpoints)
+               for path in input_paths}
+    handles = [handle for path_handles in sources.values()
+               for handle in path_handles]
+    Thread(target=close_all, args=(handles,)).start()
+    asyncio.run(run_resumable(sources, 0.1, output_path,
+                              checkpoint_path, 0.2))
+
+with TemporaryDirectory() as tmpdir:
+    input_paths = [os.path.join(tmpdir, str(i)) for i in range(3)]
+    output_path = os.path.join(tmpdir, 'merged')
+    checkpoint_path = os.path.join(tmpdir, 'checkpoints.json')
+
+    for path in input_paths:
+        append_lines(path, 0, 5)
+    run_resumable_once(input_paths, output_path, checkpoint_path)
+
+    for path in input_paths:
+        append_lines(path, 5, 5)
+    os.replace(input_paths[1], input_paths[1] + '.1')  # Rotate
+    append_lines(input_paths[1], 100, 2)
+    with open(input_paths[2], 'wb'):                   # Truncate
+        pass
+    append_lines(input_paths[2], 200, 7)
+    run_resumable_once(input_paths, output_path, checkpoint_path)
+
+    append_lines(input_paths[0], 10, 2)
+    os.replace(input_paths[0], input_paths[0] + '.1')  # Rotate, no new file yet
+    creator = Timer(0.3, append_lines, (input_paths[0], 300, 3))
+    creator.start()
+    run_resumable_once(input_paths, output_path, checkpoint_path)
+    creator.join()
+
+    with open(output_path, 'rb') as f:
+        merged = f.readlines()
+    print(f'Merged {len(merged)} lines over three runs')
+    expected = set()
+    for path, numbers in ((input_paths[0], [*range(12), 300, 301, 302]),
+                          (input_paths[1], [*range(10), 100, 101]),
+                          (input_paths[2], [*range(5), *range(200, 207)])):
+        expected.update(f'{path}-{i:02}\n'.encode() for i in numbers)
+    assert len(merged) == len(set(merged))
+    assert set(merged) == expected
+
+
+# Example 23:  confirm_merge checks every output line against every input path and loads every
+# input into memory, so it is O(lines x files) in time and O(lines) in space.   With thousands of
+# inputs it takes longer than the merge.   confirm_merge_fast parses the path prefix once per line
+# and looks it up in a dict.   For each file it keeps only a line count and a running hash of the
+# lines in order, so memory is O(files) and the order of each file's lines is still checked.
+def source_of(line):
+    # Lines look like b'{path}-{index}-{letters}\n'; the path may contain dashes.
+    return line.rsplit(b'-', 2)[0]
+
+def digest_lines(lines):
+    count = 0
+    digest = hashlib.blake2b()
+    for line in lines:
+        count += 1
+        digest.update(line)
+    return count, digest.hexdigest()
+
+def confirm_merge_fast(input_paths, output_path):
+    found = {path.encode(): (0, hashlib.blake2b()) for path in input_paths}
+    with open(output_path, 'rb') as f:
+        for line in f:
+            key = source_of(line)
+            assert key in found, f'Unexpected line {line!r}'
+            count, digest = found[key]
+            digest.update(line)
+            found[key] = (count + 1, digest)
+
+    for path in input_paths:
+        with open(path, 'rb') as f:
+            expected = digest_lines(f)
+        count, digest = found[path.encode()]
+        assert expected == (count, digest.hexdigest()), \
+            f'{path}: {expected!r} == {(count, digest.hexdigest())!r}'
+
+
+# Example 24:  Both verifiers accept a correct merge, but only the fast one keeps up as the
+# number of inputs grows.   The file names are zero padded because confirm_merge also matches a
+# line from file "10" against path "1", a prefix of it; confirm_merge_fast compares the whole prefix.
+def make_merged_files(directory, file_count, lines_per_file):
+    paths = [os.path.join(directory, f'{i:05}') for i in range(file_count)]
+    for path in paths:
+        with open(path, 'wb') as f:
+            for i in range(lines_per_file):
+                f.write(f'{path}-{i:02}-abcdefghij\n'.encode())
+
+    output_path = os.path.join(directory, 'merged')
+    with open(output_path, 'wb') as output:
+        for i in range(lines_per_file):
+            for path in paths:
+                output.write(f'{path}-{i:02}-abcdefghij\n'.encode())
+    return paths, output_path
+
+with TemporaryDirectory() as tmpdir:
+    input_paths, output_path = make_merged_files(tmpdir, 500, 5)
+    for verify in (confirm_merge, confirm_merge_fast):
+        start = time.perf_counter()
+        verify(input_paths, output_path)
+        delta = time.perf_counter() - start
+        print(f'{verify.__name__} took {delta:.3f} seconds')
+
+
+# Example 25:  The merged log is stored uncompressed.   CompressedWriteThread compresses inside the
+# writer thread, so the event loop never pays for it.   Data is cut into blocks of block_size bytes
+# and each block is compressed on its own and written as a frame: a header with the compressed and
+# uncompressed sizes followed by the compressed bytes.   Because blocks are independent, a reader
+# can skip from header to header and decompress only the block that holds the offset it wants.
+import lzma
+import struct
+import zlib
+
+FRAME_HEADER = struct.Struct('>II')  # Compressed size, uncompressed size
+
+CODECS = {
+    'zlib': (lambda data, level: zlib.compress(data, level),
+             zlib.decompress),
+    'lzma': (lambda data, level: lzma.compress(data, preset=level),
+             lzma.decompress),
+}
+
+class CompressedWriteThread(BufferedWriteThread):
+    def __init__(self, output_path, block_size=256 * 1024, codec='zlib',
+                 level=6, **kwargs):
+        super().__init__(output_path, **kwargs)
+        self.block_size = block_size
+        self.compress = CODECS[codec][0]
+        self.level = level
+        self.block = bytearray()
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.compress_seconds = 0.0
+
+    def write_chunks(self, fd, chunks, force):
+        for chunk in chunks:
+            self.block += chunk
+
+        frames = []
+        while len(self.block) >= self.block_size:
+            frames.extend(self.compress_block(self.block[:self.block_size]))
+            del self.block[:self.block_size]
+        if force and self.block:
+            frames.extend(self.compress_block(self.block))
+            self.block.clear()
+
+        write_all(fd, frames)
+
+    def compress_block(self, block):
+        start = time.perf_counter()
+        data = self.compress(bytes(block), self.level)
+        self.compress_seconds += time.perf_counter() - start
+        self.raw_bytes += len(block)
+        self.compressed_bytes += FRAME_HEADER.size + len(data)
+        return [FRAME_HEADER.pack(len(data), len(block)), data]
+
+    def report(self):
+        ratio = self.raw_bytes / max(self.compressed_bytes, 1)
+        throughput = self.raw_bytes / max(self.compress_seconds, 1e-9) / 1e6
+        return ratio, throughput
+
+
+# Example 26:  Readers walk the frame headers with seek, which is cheap, and decompress only the
+# frames that overlap the range they asked for.
+def read_frames(path):
+    with open(path, 'rb') as f:
+        raw_offset = 0
+        while header := f.read(FRAME_HEADER.size):
+            compressed_size, raw_size = FRAME_HEADER.unpack(header)
+            yield f.tell(), compressed_size, raw_offset, raw_size
+            f.seek(compressed_size, 1)
+            raw_offset += raw_size
+
+def read_range(path, offset, size, codec='zlib'):
+    decompress = CODECS[codec][1]
+    result = bytearray()
+    with open(path, 'rb') as f:
+        for position, compressed_size, raw_offset, raw_size in read_frames(path):
+            if raw_offset + raw_size <= offset:
+                continue
+            if raw_offset >= offset + size:
+                break
+            f.seek(position)
+            block = decompress(f.read(compressed_size))
+            start = max(offset - raw_offset, 0)
+            result += block[start:offset + size - raw_offset]
+    return bytes(result)
+
+
+# Example 27:  The compressed merge holds exactly the same lines, and we can read any slice of it
+# without decompressing the whole file.
+import functools
+
+tmpdir, input_paths, handles, output_path = setup()
+
+small_blocks = functools.partial(CompressedWriteThread, block_size=256)
+asyncio.run(run_fully_async(handles, 0.1, output_path,
+                            writer_class=small_blocks))
+
+total_size = sum(raw_size for *_, raw_size in read_frames(output_path))
+plain_path = output_path + '.plain'
+with open(plain_path, 'wb') as f:
+    f.write(read_range(output_path, 0, total_size))
+confirm_merge_fast(input_paths, plain_path)
+
+with open(plain_path, 'rb') as f:
+    f.seek(1000)
+    assert f.read(100) == read_range(output_path, 1000, 100)
+
+tmpdir.cleanup()
+
+
+# Example 28:  To tune the level we compress the same log data with each codec and report the
+# compression ratio and throughput.
+async def compress_lines(output_path, lines, **kwargs):
+    async with CompressedWriteThread(output_path, **kwargs) as output:
+        for line in lines:
+            await output.write(line)
+    return output.report()
+
+lines = []
+for i in range(50_000):
+    letters = random.choices(string.ascii_lowercase, k=10)
+    lines.append(f'/var/log/app/{i % 50}-{i:08}-{"".join(letters)}\n'.encode())
+
+with TemporaryDirectory() as tmpdir:
+    for codec, level in [('zlib', 1), ('zlib', 6), ('zlib', 9), ('lzma', 1)]:
+        path = os.path.join(tmpdir, f'{codec}-{level}')
+        ratio, throughput = asyncio.run(compress_lines(
+            path, lines, codec=codec, level=level))
+        print(f'{codec} level {level}: ratio {ratio:.2f}, '
+              f'{throughput:.1f} MB/s')
@@ -149,4 +149,612 @@ stats.print_stats()
 stats = Stats(profiler, stream=STDOUT)
 stats.strip_dirs()
 stats.sort_stats('cumulative')
-stats.print_callers()
\ No newline at end of file
+stats.print_callers()
+
+# Example 11:  Even with bisect_left, insert_value still pays O(n) for list.insert because every
+# element after the insertion point has to move.   A 10**6 element stream takes minutes.   SortedList
+# stores the values in a list of sorted blocks of at most 2 * LOAD values, plus a list of each
+# block's largest value.   Finding the block is a bisect over maxes and inserting only shifts
+# values inside one small block.   A block that grows too large is split in two.
+from bisect import bisect_right, insort
+
+class SortedList:
+    LOAD = 1000
+
+    def __init__(self, iterable=()):
+        values = sorted(iterable)
+        self.blocks = [values[i:i + self.LOAD]
+                       for i in range(0, len(values), self.LOAD)]
+        self.maxes = [block[-1] for block in self.blocks]
+        self.size = len(values)
+        self.tree = None   # Positional index, rebuilt when blocks split or vanish
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+    def __contains__(self, value):
+        i = bisect_left(self.maxes, value)
+        if i == len(self.maxes):
+            return False
+        block = self.blocks[i]
+        j = bisect_left(block, value)
+        return block[j] == value
+
+    def add(self, value):
+        if not self.blocks:
+            self.blocks.append([value])
+            self.maxes.append(value)
+            self.size = 1
+            self.tree = None
+            return
+
+        i = bisect_right(self.maxes, value)
+        if i == len(self.maxes):
+            i -= 1
+        block = self.blocks[i]
+        insort(block, value)
+        self.maxes[i] = block[-1]
+        self.size += 1
+
+        if len(block) > 2 * self.LOAD:
+            self.blocks[i:i + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self.maxes.insert(i, block[self.LOAD - 1])
+            self.tree = None
+        elif self.tree is not None:
+            self.tree_add(i, 1)
+
+    def remove(self, value):
+        i = bisect_left(self.maxes, value)
+        if i == len(self.maxes):
+            raise ValueError(f'{value!r} not in list')
+        block = self.blocks[i]
+        j = bisect_left(block, value)
+        if block[j] != value:
+            raise ValueError(f'{value!r} not in list')
+        del block[j]
+        self.size -= 1
+        if block:
+            self.maxes[i] = block[-1]
+            if self.tree is not None:
+                self.tree_add(i, -1)
+        else:
+            del self.blocks[i]
+            del self.maxes[i]
+            self.tree = None
+
+
+# Example 12:  The positional index is a Fenwick tree over the block lengths.   It answers "how
+# many values come before block i" and "which block holds position k" in O(log n), which gives us
+# indexing and bisect that return positions in the whole list.
+    def build_tree(self):
+        tree = [0] + [len(block) for block in self.blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def tree_add(self, block_index, delta):
+        i = block_index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def values_before(self, block_index):
+        if self.tree is None:
+            self.build_tree()
+        total = 0
+        i = block_index
+        while i:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def locate(self, index):
+        if self.tree is None:
+            self.build_tree()
+        block_index = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            next_index = block_index + step
+            if next_index < len(self.tree) and self.tree[next_index] <= index:
+                block_index = next_index
+                index -= self.tree[next_index]
+            step >>= 1
+        return block_index, index
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('SortedList index out of range')
+        block_index, offset = self.locate(index)
+        return self.blocks[block_index][offset]
+
+    def bisect_left(self, value):
+        i = bisect_left(self.maxes, value)
+        if i == len(self.maxes):
+            return self.size
+        return self.values_before(i) + bisect_left(self.blocks[i], value)
+
+    def bisect_right(self, value):
+        i = bisect_right(self.maxes, value)
+        if i == len(self.maxes):
+            return self.size
+        return self.values_before(i) + bisect_right(self.blocks[i], value)
+
+
+# Example 13:  SortedDict keeps its keys in a SortedList next to an ordinary dict, so lookups are
+# still O(1) and iteration is in key order.
+class SortedDict:
+    def __init__(self, items=()):
+        self.data = dict(items)
+        self.sorted_keys = SortedList(self.data)
+
+    def __setitem__(self, key, value):
+        if key not in self.data:
+            self.sorted_keys.add(key)
+        self.data[key] = value
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.sorted_keys.remove(key)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.sorted_keys)
+
+    def keys(self):
+        return list(self.sorted_keys)
+
+    def items(self):
+        return [(key, self.data[key]) for key in self.sorted_keys]
+
+    def peekitem(self, index=-1):
+        key = self.sorted_keys[index]
+        return key, self.data[key]
+
+    def bisect_left(self, key):
+        return self.sorted_keys.bisect_left(key)
+
+
+# Example 14:  SortedList agrees with sorted() and bisect on random data, including removals.
+reference = []
+values = SortedList()
+for _ in range(20_000):
+    value = randint(0, 5_000)
+    values.add(value)
+    insort(reference, value)
+    if randint(0, 3) == 0:
+        removed = reference.pop(randint(0, len(reference) - 1))
+        values.remove(removed)
+assert list(values) == reference
+assert all(values[i] == reference[i] for i in range(0, len(reference), 97))
+assert all(values.bisect_left(v) == bisect_left(reference, v)
+           for v in range(-1, 5_002, 13))
+
+prices = SortedDict({'pear': 3, 'apple': 1})
+prices['fig'] = 2
+print(prices.items(), prices.peekitem(0))
+
+
+# Example 15:  Now we time insertion_sort with both versions of insert_value from Examples 2 and 6
+# against SortedList.add.   The list versions are O(n**2) overall, so we only run them while they
+# finish in reasonable time.   Pass --full on the command line to run every size up to 10**7.
+import sys
+import time
+
+def insert_value_scan(array, value):
+    for i, existing in enumerate(array):
+        if existing > value:
+            array.insert(i, value)
+            return
+    array.append(value)
+
+def insert_value_bisect(array, value):
+    i = bisect_left(array, value)
+    array.insert(i, value)
+
+def sort_with(insert, data):
+    result = []
+    for value in data:
+        insert(result, value)
+    return result
+
+def sort_with_sorted_list(data):
+    result = SortedList()
+    for value in data:
+        result.add(value)
+    return result
+
+full = '--full' in sys.argv
+sizes = [10**3, 10**4, 10**5, 10**6, 10**7] if full else [10**3, 10**4, 10**5]
+limits = {
+    'insert_value_scan': 10**4,
+    'insert_value_bisect': 10**6 if full else 10**5,
+    'SortedList.add': 10**7,
+}
+contenders = [
+    ('insert_value_scan', lambda data: sort_with(insert_value_scan, data)),
+    ('insert_value_bisect', lambda data: sort_with(insert_value_bisect, data)),
+    ('SortedList.add', sort_with_sorted_list),
+]
+
+for size in sizes:
+    data = [randint(0, size) for _ in range(size)]
+    for name, func in contenders:
+        if size > limits[name]:
+            continue
+        start = time.perf_counter()
+        func(data)
+        delta = time.perf_counter() - start
+        print(f'{name:<20} n={size:<10,} {delta:.3f} seconds')
+
+
+
+# Example 16:  Every experiment above sets up Profile, runcall, Stats, strip_dirs, sort_stats and
+# print_stats by hand.   ProfileCollector wraps that up.   It accumulates cProfile data across many
+# calls, through either the profiled decorator or the profiling context manager.   Each thread
+# gets one Profile that is enabled only during profiled calls and keeps adding to its data, so a
+# call costs an enable and a disable; Stats are only built when we ask for a snapshot.
+#
+# cProfile instruments every call, so to leave it on in a production process we only profile a
+# sample of the calls: sample_rate=0.01 profiles about one call in a hundred and the rest run at
+# full speed.   Only one Profile can be active per thread, so calls that start while another
+# profiled call is running on the same thread are not profiled again.   Since Python 3.12 only
+# one Profile can be active in the whole process, so a call that can't enable its profiler just
+# runs unprofiled: profiling never raises into the wrapped call.
+import contextlib
+import functools
+import json
+import threading
+
+def function_label(func):
+    filename, lineno, name = func
+    if filename == '~':
+        return name   # Built-in function
+    return f'{os.path.basename(filename)}:{lineno}({name})'
+
+class ProfileCollector:
+    def __init__(self, sample_rate=1.0):
+        self.sample_rate = sample_rate
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.profilers = []   # One per thread
+        self.active = set()   # Profilers in the middle of a call
+        self.dumps = []       # Profiles merged from other processes
+        self.profiled_calls = 0
+
+    def begin(self, sampled=False):
+        if getattr(self.local, 'active', False) or (
+                not sampled and random.random() >= self.sample_rate):
+            return None
+        # Skip this call rather than wait while a snapshot reads the profilers
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            profiler = getattr(self.local, 'profiler', None)
+            if profiler is None:
+                profiler = self.local.profiler = Profile()
+                self.profilers.append(profiler)
+            # Marked while still holding the lock, so no snapshot reads a running profiler
+            self.active.add(profiler)
+            self.local.active = True
+            profiler.enable()
+        except ValueError:
+            self.active.discard(profiler)
+            self.local.active = False
+            return None   # Another profiler is active in this process
+        finally:
+            self.lock.release()
+        return profiler
+
+    def end(self, profiler):
+        if profiler is not None:
+            profiler.disable()
+            self.active.discard(profiler)
+            self.local.active = False
+            self.profiled_calls += 1
+
+    @contextlib.contextmanager
+    def profiling(self):
+        profiler = self.begin()
+        try:
+            yield
+        finally:
+            self.end(profiler)
+
+    def profiled(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if random.random() >= self.sample_rate:
+                return func(*args, **kwargs)   # The fast path
+            profiler = self.begin(sampled=True)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.end(profiler)
+        return wrapper
+
+    def snapshot(self):
+        # Building Stats disables a profiler, so ones in the middle of a call are left for the
+        # next snapshot.   Holding the lock keeps the rest from starting until we're done.
+        stats = Stats()
+        with self.lock:
+            for profiler in self.profilers:
+                if profiler not in self.active:
+                    stats.add(profiler)
+            for path in self.dumps:
+                stats.add(path)
+        return stats
+
+
+# Example 17:  To merge profiles from several processes, each process writes its data with dump
+# and the parent adds the files to its own with merge.
+    def dump(self, path):
+        self.snapshot().dump_stats(path)
+
+    def merge(self, *paths):
+        with self.lock:
+            self.dumps.extend(paths)
+
+
+# Example 18:  Stats only records caller-to-callee edges, not whole stacks, so collapsed_stacks
+# rebuilds them.   Starting at each root it follows the edges, and a function's time is split
+# between its callers in proportion to the time each caller spent in it.   Each output line is a
+# stack of frames separated by semicolons and the microseconds spent in the last frame, the format
+# that flamegraph.pl and speedscope read.   Recursive edges are cut so every stack is finite.
+# The number of distinct paths grows exponentially with the depth of the call graph, so a path is
+# only followed while the time it carries is at least min_fraction of the total (a flame graph
+# can't show anything narrower) and at least one microsecond, the output's resolution.   At most
+# 1 / min_fraction paths survive at each depth.
+    def collapsed_stacks(self, min_fraction=0.001):
+        stats = self.snapshot().stats
+        roots = [func for func, value in stats.items() if not value[4]]
+        total = sum(stats[func][3] for func in roots)
+        threshold = max(total * min_fraction, 1e-6)
+        callees = {}
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller in callers:
+                callees.setdefault(caller, []).append(func)
+
+        lines = {}
+
+        def visit(func, stack, share):
+            self_time = stats[func][2]
+            stack = stack + [func]
+            micros = round(self_time * share * 1e6)
+            if micros:
+                key = ';'.join(map(function_label, stack))
+                lines[key] = lines.get(key, 0) + micros
+            for callee in callees.get(func, []):
+                callee_total = stats[callee][3]
+                if callee in stack or not callee_total:
+                    continue
+                edge_time = stats[callee][4][func][3]
+                if share * edge_time < threshold:
+                    continue   # Too little time to show
+                visit(callee, stack, share * edge_time / callee_total)
+
+        for func in roots:   # No callers
+            visit(func, [], 1.0)
+        return '\n'.join(f'{stack} {micros}'
+                         for stack, micros in sorted(lines.items()))
+
+
+# Example 19:  caller_callee_table gives the same information as print_callers and print_callees
+# as plain data, and to_json serializes it for other tools.
+    def caller_callee_table(self):
+        stats = self.snapshot().stats
+        callees = {}
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller, (_, calls, _, cumulative) in callers.items():
+                callees.setdefault(caller, []).append({
+                    'function': function_label(func),
+                    'calls': calls,
+                    'cumulative_time': cumulative,
+                })
+
+        table = []
+        for func, (primitive, calls, self_time, cumulative, callers) in stats.items():
+            table.append({
+                'function': function_label(func),
+                'calls': calls,
+                'primitive_calls': primitive,
+                'self_time': self_time,
+                'cumulative_time': cumulative,
+                'callers': [{'function': function_label(caller),
+                             'calls': caller_calls,
+                             'cumulative_time': caller_cumulative}
+                            for caller, (_, caller_calls, _, caller_cumulative)
+                            in callers.items()],
+                'callees': callees.get(func, []),
+            })
+        table.sort(key=lambda row: row['cumulative_time'], reverse=True)
+        return table
+
+    def to_json(self):
+        return json.dumps(self.caller_callee_table(), indent=2)
+
+
+# Example 20:  We profile my_program in this process and in two child processes, merge the
+# three profiles, and export them.   first_func should dominate the flame graph, as it did in
+# Example 10.   The children are forked before the sampler in Example 22 starts its thread, so no
+# child inherits a lock held by another thread.   Windows has no fork, so there only this
+# process is profiled.
+import multiprocessing
+
+collector = ProfileCollector()
+profiled_program = collector.profiled(my_program)
+profiled_program()
+
+def profile_in_child(path):
+    child_collector = ProfileCollector()
+    child_collector.profiled(my_program)()
+    child_collector.dump(path)
+
+if os.name == 'nt':
+    print("The child processes don't work on Windows")
+    paths = []
+else:
+    paths = [os.path.join(TEST_DIR.name, f'child{i}.prof') for i in range(2)]
+    context = multiprocessing.get_context('fork')
+    children = [context.Process(target=profile_in_child, args=(path,))
+                for path in paths]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join()
+collector.merge(*paths)
+
+print(f'Merged {len(collector.dumps) + 1} profiles')
+print(collector.collapsed_stacks())
+table = json.loads(collector.to_json())
+print(json.dumps(table[:3], indent=2)[:600])
+
+
+# Example 21:  With sampling only some calls pay for profiling.   The context manager works for
+# blocks of code that aren't a single function call.
+sampled = ProfileCollector(sample_rate=0.05)
+sampled_first_func = sampled.profiled(first_func)
+
+start = time.perf_counter()
+for _ in range(200):
+    first_func()
+plain = time.perf_counter() - start
+
+start = time.perf_counter()
+for _ in range(200):
+    sampled_first_func()
+with_sampling = time.perf_counter() - start
+print(f'{sampled.profiled_calls} of 200 calls profiled, overhead '
+      f'{with_sampling / plain - 1:.1%}')
+
+block_collector = ProfileCollector()
+with block_collector.profiling():
+    second_func()
+print(f'{block_collector.profiled_calls} block profiled')
+
+# Before any call is sampled every view is empty rather than an error.
+assert ProfileCollector(sample_rate=0.01).collapsed_stacks() == ''
+assert ProfileCollector().caller_callee_table() == []
+
+
+# Example 22:  Even sampled, cProfile slows down every call it watches, so a program like
+# my_program runs several times slower while it is profiled.   A sampling profiler never touches
+# the program's calls.   A background thread wakes up interval seconds apart, reads every other
+# thread's current frame with sys._current_frames() and walks f_back to get its stack.   Samples
+# are counted per distinct stack in a dict of at most max_stacks entries, so memory stays bounded
+# in a long-running service; samples of new stacks beyond that are only counted as dropped.
+from collections import Counter
+
+class SamplingProfiler:
+    def __init__(self, interval=0.01, max_stacks=10_000, max_depth=64):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.counts = Counter()
+        self.samples = 0
+        self.dropped = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        me = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != me:
+                    self.record(frame)
+
+    def record(self, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        key = tuple(reversed(stack))
+        self.samples += 1
+        if key in self.counts or len(self.counts) < self.max_stacks:
+            self.counts[key] += 1
+        else:
+            self.dropped += 1
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *_):
+        self.stop()
+
+
+# Example 23:  The samples give the same views as ProfileCollector: collapsed stacks for a flame
+# graph (counted in samples instead of microseconds) and a table of the functions where the most
+# samples landed, by self time (the function was on top of the stack) and total time (it was
+# anywhere on the stack).
+    def snapshot(self):
+        # The sampler thread keeps adding stacks, so work on a copy; copying a dict happens in
+        # one step under the GIL
+        return dict(self.counts)
+
+    def collapsed_stacks(self):
+        return '\n'.join(f'{";".join(map(function_label, stack))} {count}'
+                         for stack, count in sorted(self.snapshot().items()))
+
+    def print_stats(self, limit=10, stream=STDOUT):
+        self_counts = Counter()
+        total_counts = Counter()
+        counts = self.snapshot()
+        for stack, count in counts.items():
+            self_counts[stack[-1]] += count
+            for func in set(stack):
+                total_counts[func] += count
+
+        recorded = max(sum(counts.values()), 1)
+        print(f'{self.samples} samples, {self.dropped} dropped', file=stream)
+        print(f'{"self":>7} {"total":>7}  function', file=stream)
+        for func, count in total_counts.most_common(limit):
+            print(f'{self_counts[func] / recorded:7.1%} '
+                  f'{count / recorded:7.1%}  {function_label(func)}',
+                  file=stream)
+
+
+# Example 24:  Sampling my_program at 100 Hz finds the same hot spot as Example 9, while the
+# program itself runs at nearly full speed.   A single short run is too noisy to measure an
+# overhead of a few percent, so plain and sampled runs of about a second each alternate, and we
+# compare the fastest of each.
+import timeit
+
+def run_my_program(times=20):
+    for _ in range(times):
+        my_program()
+
+plain_runs = []
+sampled_runs = []
+for _ in range(5):
+    plain_runs.append(timeit.timeit(run_my_program, number=1))
+    with SamplingProfiler(interval=0.01) as sampler:
+        sampled_runs.append(timeit.timeit(run_my_program, number=1))
+
+sampler.print_stats(limit=5)
+print(sampler.collapsed_stacks().splitlines()[-1])
+print(f'Overhead at 100 Hz: {min(sampled_runs) / min(plain_runs) - 1:.1%} '
+      f'(best of {len(plain_runs)} runs of {min(plain_runs):.2f}s)')
@@ -275,4 +275,236 @@ for count in (1_000, 2_000, 3_000, 4_000, 5_000):
     print()
     comparison = dequeue_popleft_benchmark(count)
     print_delta(baseline, comparison)
-print(2 * n * '*')
\ No newline at end of file
+print(2 * n * '*')
+
+# Example 13:  Examples 6 to 12 repeat the same steps for every benchmark: time one hand-picked
+# count after another, then eyeball the slowdown printed by print_delta.   A benchmark can instead
+# be written once as a factory: called with a count, it returns a prepare function that builds
+# fresh input and a run function that does the work being measured.   time_scaling warms up
+# each count before timing it, repeats the timing and keeps the median, which is less disturbed
+# by a stray slow run than the average used by print_results.
+import math
+import statistics
+
+def time_scaling(factory, counts, repeat=20, warmup=3):
+    results = []
+    for count in counts:
+        prepare, run = factory(count)
+        timer = timeit.Timer(
+            setup='queue = prepare()',
+            stmt='run(queue)',
+            globals={'prepare': prepare, 'run': run})
+        timer.repeat(repeat=warmup, number=1)
+        tests = timer.repeat(repeat=repeat, number=1)
+        results.append((count, statistics.median(tests)))
+    return results
+
+
+# Example 14:  Each complexity class is a model time = c * f(count).   The constant c is fitted to
+# the relative error of every measurement, so the slow large counts don't swamp the fast small
+# ones, and the model with the smallest remaining error is the empirical class.   Counts that grow
+# geometrically (doubling here) make the classes easiest to tell apart.
+COMPLEXITY_MODELS = {
+    'O(1)': lambda n: 1,
+    'O(log n)': lambda n: math.log(n),
+    'O(n)': lambda n: n,
+    'O(n log n)': lambda n: n * math.log(n),
+    'O(n^2)': lambda n: n * n,
+}
+
+def fit_complexity(results):
+    errors = {}
+    for name, model in COMPLEXITY_MODELS.items():
+        ratios = [model(count) / elapsed for count, elapsed in results]
+        scale = sum(ratios) / sum(ratio * ratio for ratio in ratios)
+        errors[name] = sum((scale * ratio - 1) ** 2 for ratio in ratios)
+    return min(errors, key=errors.get), errors
+
+
+# Example 15:  check_scaling ties it together.   It prints each count the way print_results and
+# print_delta did, flags a benchmark whose empirical class differs from the expected one, and
+# stores the timings by name in a JSON file.   When the same benchmark ran before, the new
+# timings are compared count by count with the stored ones, so a change can be judged against
+# the previous run rather than from memory.   The caller chooses where the file lives.
+import json
+import sys
+
+def load_scaling_results(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def check_scaling(name, factory, expected, path,
+                  counts=(1_000, 2_000, 4_000, 8_000, 16_000), **kwargs):
+    results = time_scaling(factory, counts, **kwargs)
+    stored = load_scaling_results(path)
+    previous = dict(stored.get(name, []))
+
+    print(f'{name}:')
+    baseline_count, baseline_time = results[0]
+    for count, elapsed in results:
+        line = (f'Count {count:>6,} takes {elapsed:.6f}s, '
+                f'{count / baseline_count:>4.1f}x data size, '
+                f'{elapsed / baseline_time:>5.1f}x time')
+        before = previous.get(str(count))
+        if before:
+            line += f', {elapsed / before:>4.2f}x previous run'
+        print(line)
+
+    found, _ = fit_complexity(results)
+    if found == expected:
+        print(f'Scales as {found}, as expected')
+    else:
+        print(f'UNEXPECTED: scales as {found}, expected {expected}')
+
+    stored[name] = [(str(count), elapsed) for count, elapsed in results]
+    with open(path, 'w') as f:
+        json.dump(stored, f, indent=2)
+    return found
+
+
+# Example 16:  The four benchmarks above as factories.   The time to drain a whole queue is
+# measured, so popleft on a deque is O(n) in total and pop(0) on a list is O(n^2).   Running
+# 'deque popleft' a second time shows the comparison against its stored run.   Like all output
+# of this script the results go to the temporary directory; pass --results PATH to keep them, and
+# the next run with the same PATH compares every benchmark with this one.
+def list_append_factory(count):
+    def run(queue):
+        for i in range(count):
+            queue.append(i)
+    return list, run
+
+def list_pop_factory(count):
+    def run(queue):
+        while queue:
+            queue.pop(0)
+    return lambda: list(range(count)), run
+
+def deque_popleft_factory(count):
+    def run(queue):
+        while queue:
+            queue.popleft()
+    return lambda: collections.deque(range(count)), run
+
+if '--results' in sys.argv:
+    results_path = os.path.join(OLD_CWD, sys.argv[sys.argv.index('--results') + 1])
+else:
+    results_path = os.path.join(TEST_DIR.name, 'scaling_results.json')
+
+print(n*'*', 'Fitted complexity benchmarks', n*'*')
+check_scaling('list append', list_append_factory, 'O(n)', results_path)
+check_scaling('list pop(0)', list_pop_factory, 'O(n^2)', results_path, repeat=5)
+check_scaling('deque popleft', deque_popleft_factory, 'O(n)', results_path)
+# Expecting the wrong class is flagged
+check_scaling('deque popleft', deque_popleft_factory, 'O(1)', results_path)
+print(2 * n * '*')
+
+
+# Example 17:  The loop in Example 5 drains every available email into the queue but consumes
+# only one per iteration, so when email arrives faster than one per iteration the queue grows
+# without limit.   BoundedEmailQueue is a ring buffer on a deque with maxlen, so its memory is
+# fixed no matter how far the consumer falls behind.   What happens to an email that arrives when
+# the queue is full is the overflow policy: 'drop_oldest' discards the head (the deque does this
+# by itself), 'drop_newest' discards the arriving email and 'backpressure' refuses it with
+# QueueFullError, so the producer has to stop receiving and leave the rest at the source.
+# high_water records the longest the queue ever got.
+class QueueFullError(Exception):
+    pass
+
+class BoundedEmailQueue:
+    OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'backpressure')
+
+    def __init__(self, capacity, overflow='drop_oldest'):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f'Unknown overflow policy: {overflow!r}')
+        self.capacity = capacity
+        self.overflow = overflow
+        self.items = collections.deque(maxlen=capacity)
+        self.high_water = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def full(self):
+        return len(self.items) >= self.capacity
+
+    def accepting(self):
+        return self.overflow != 'backpressure' or not self.full()
+
+    def append(self, email):
+        if self.full():
+            if self.overflow == 'backpressure':
+                raise QueueFullError
+            self.dropped += 1
+            if self.overflow == 'drop_newest':
+                return False
+        self.items.append(email)  # With maxlen, drops the oldest when full
+        self.high_water = max(self.high_water, len(self.items))
+        return True
+
+    def popleft_many(self, max_items):
+        count = min(max_items, len(self.items))
+        return [self.items.popleft() for _ in range(count)]
+
+
+# Example 18:  The producer stops receiving when a backpressure queue fills up, and the consumer
+# takes a batch of up to batch_size emails per tick instead of just one.   The receive function
+# is a parameter so the simulation below can use a quiet source.
+def produce_emails_bounded(queue, receive=try_receive_email):
+    while queue.accepting():
+        try:
+            email = receive()
+        except NoEmailError:
+            return
+        else:
+            queue.append(email)  # Producer
+
+def consume_email_batch(queue, batch_size):
+    for email in queue.popleft_many(batch_size):  # Consumer
+        # Index the message for long-term archival
+        print(f'Consumed email: {email.message}')
+
+def batch_loop(queue, keep_running, batch_size):
+    while keep_running():
+        produce_emails_bounded(queue)
+        consume_email_batch(queue, batch_size)
+
+my_end_func = make_test_end()
+EMAIL_IT = get_emails()
+batch_loop(BoundedEmailQueue(capacity=4), my_end_func, batch_size=2)
+
+
+# Example 19:  A sustained input rate shows the difference.   Each tick about arrivals_per_tick
+# emails arrive, with some random jitter.   When the consumer's batch keeps up on average, the
+# queue only has to absorb bursts and the high-water mark levels off far below the capacity; the
+# one-at-a-time consumer would have needed a queue as long as the whole backlog.   When it can't
+# keep up, memory still stays at the capacity and the policy decides which emails are lost
+# (drop_*) or left waiting at the source (backpressure).
+def simulate(queue, ticks, arrivals_per_tick, batch_size):
+    waiting = 0  # Emails not yet received from the source
+
+    def receive():
+        nonlocal waiting
+        if not waiting:
+            raise NoEmailError
+        waiting -= 1
+        return Email('sender@example.com', 'receiver@example.com', 'load')
+
+    consumed = 0
+    for _ in range(ticks):
+        waiting += random.randint(0, 2 * arrivals_per_tick)
+        produce_emails_bounded(queue, receive)
+        consumed += len(queue.popleft_many(batch_size))
+    print(f'{queue.overflow:>12}, batch {batch_size:>3}: consumed {consumed:>6,}, '
+          f'dropped {queue.dropped:>6,}, left at source {waiting:>6,}, '
+          f'high water {queue.high_water:>5,} of {queue.capacity:,}')
+
+print(n*'*', 'Bounded email queue at 10 emails per tick', n*'*')
+for policy in BoundedEmailQueue.OVERFLOW_POLICIES:
+    simulate(BoundedEmailQueue(1_000, policy), 10_000, 10, batch_size=20)
+for policy in BoundedEmailQueue.OVERFLOW_POLICIES:
+    simulate(BoundedEmailQueue(1_000, policy), 10_000, 10, batch_size=8)
+print(2 * n * '*')
@@ -113,4 +113,309 @@ comparison = timeit.timeit(
 print(f'Bisect search takes {comparison:.6f}s')
 
 slowdown = 1 + ((baseline - comparison) / comparison)
-print(f'{slowdown:.1f}x time')
\ No newline at end of file
+print(f'{slowdown:.1f}x time')
+
+# Example 5:  Example 4 still pays for one Python-level call per key, and find_closest scans
+# linearly.   When millions of keys are looked up at once, SortedIndex keeps the sorted values in
+# a compact array and answers a whole batch in one call.   With NumPy installed the values are an
+# int64 ndarray and a batch is a searchsorted, which runs the binary searches in compiled code.
+# Random keys make every binary search miss the CPU cache, so large batches are sorted first and
+# the answers scattered back into the caller's order.   Integer keys are sorted together with
+# their positions packed into the low bits of one int64, which is several times faster than an
+# argsort.   Once the keys are sorted, a batch with more keys than values is answered the other
+# way around: each value is searched for among the keys, and a running count of those positions
+# gives every key's answer in O(values + keys).   Without NumPy the values are an array('q') and
+# each key is bisected in turn, which gives the same answers but not the speed.
+from array import array
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # SortedIndex falls back to array('q') and bisect
+    np = None
+
+def sort_with_order(goals):
+    bits = (len(goals) - 1).bit_length()
+    if goals.dtype.kind == 'i':
+        low = int(goals.min())
+        if (int(goals.max()) - low).bit_length() + bits <= 62:
+            packed = (goals.astype(np.int64) - low) << bits
+            packed |= np.arange(len(goals), dtype=np.int64)
+            packed.sort()
+            order = packed & ((1 << bits) - 1)
+            packed >>= bits
+            packed += low
+            return packed, order
+    order = np.argsort(goals)
+    return goals[order], order
+
+class SortedIndex:
+    def __init__(self, values, assume_sorted=False):
+        if not assume_sorted:
+            values = sorted(values)
+        if np is not None:
+            self.values = np.asarray(values, dtype=np.int64)
+        else:
+            self.values = array('q', values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def lookup(self, goals, side='left'):
+        # Like bisect_left (or bisect_right) for every goal
+        if np is not None:
+            goals = np.asarray(goals)
+            if len(goals) < 1024:
+                return np.searchsorted(self.values, goals, side=side)
+            sorted_goals, order = sort_with_order(goals)
+            indexes = np.empty(len(goals), dtype=np.intp)
+            indexes[order] = self.lookup_sorted(sorted_goals, side)
+            return indexes
+        bisect = bisect_left if side == 'left' else bisect_right
+        return array('q', (bisect(self.values, goal) for goal in goals))
+
+    def lookup_sorted(self, goals, side):
+        if len(self.values) >= len(goals):
+            return np.searchsorted(self.values, goals, side=side)
+        # Values before goal j are exactly those whose position among the goals is at most j
+        other_side = 'right' if side == 'left' else 'left'
+        positions = np.searchsorted(goals, self.values, side=other_side)
+        counts = np.bincount(positions, minlength=len(goals) + 1)
+        return np.cumsum(counts[:len(goals)])
+
+
+# Example 6:  Range queries are two lookups, for low and high, so they cost O(log n) however many
+# values fall in between.   As with range() the low bound is inclusive and the high bound is
+# exclusive.   slice_range returns a view of the NumPy array, or an array('q') copy, rather than
+# a list of Python ints.
+    def count_range(self, low, high):
+        start, end = self.lookup([low, high])
+        return max(int(end) - int(start), 0)
+
+    def slice_range(self, low, high):
+        start, end = self.lookup([low, high])
+        return self.values[start:max(start, end)]
+
+
+# Example 7:  find_closest returns, for every goal, the index of the first value greater than it,
+# which is bisect_right, and raises the same ValueError as Example 2 when a goal is past the last
+# value.   The whole batch is checked before anything is returned; with NumPy only the largest
+# index needs checking, since every other goal is then in bounds too.
+    def find_closest(self, goals):
+        indexes = self.lookup(goals, side='right')
+        size = len(self.values)
+        if np is not None:
+            if len(indexes) and indexes.max() == size:
+                raise ValueError(f'{np.asarray(goals)[indexes.argmax()]} is out of bounds')
+            return indexes
+        for goal, index in zip(goals, indexes):
+            if index == size:
+                raise ValueError(f'{goal} is out of bounds')
+        return indexes
+
+sorted_index = SortedIndex(range(10**5), assume_sorted=True)
+assert list(sorted_index.lookup([91234, 91234.56])) == [91234, 91235]
+assert list(sorted_index.find_closest([91234.56])) == [find_closest(data, 91234.56)]
+assert sorted_index.count_range(10, 20) == 10
+assert sorted_index.count_range(20, 10) == 0
+assert list(sorted_index.slice_range(10, 13)) == [10, 11, 12]
+
+try:
+    sorted_index.find_closest([5, 100000000])
+except ValueError:
+    pass  # Expected
+else:
+    assert False
+
+
+# Example 8:  Looking up a million keys as one batch against looping bisect_left over a list.   The
+# best of three runs is kept, since one run of each is easily disturbed.
+lookup_size = 10**6
+many_lookups = [random.randint(0, size) for _ in range(lookup_size)]
+batch_lookups = np.asarray(many_lookups) if np is not None else many_lookups
+
+def run_batch(sorted_index, to_lookup):
+    sorted_index.lookup(to_lookup)
+
+baseline = min(timeit.repeat(
+    stmt='run_bisect(data, many_lookups)',
+    globals=globals(),
+    repeat=3,
+    number=1))
+print(f'Looping bisect takes {baseline:.6f}s')
+
+comparison = min(timeit.repeat(
+    stmt='run_batch(sorted_index, batch_lookups)',
+    globals=globals(),
+    repeat=3,
+    number=1))
+print(f'Batch lookup takes {comparison:.6f}s')
+
+speedup = baseline / comparison
+print(f'{speedup:.1f}x faster')
+
+# Keys that arrive already sorted, as when joining two sorted tables, make the sort cheap
+sorted_lookups = np.sort(batch_lookups) if np is not None else sorted(many_lookups)
+sorted_comparison = min(timeit.repeat(
+    stmt='run_batch(sorted_index, sorted_lookups)',
+    globals=globals(),
+    repeat=3,
+    number=1))
+print(f'Batch lookup of sorted keys takes {sorted_comparison:.6f}s, '
+      f'{baseline / sorted_comparison:.1f}x faster')
+
+
+# Example 9:  A binary search over a large sorted list touches a new cache line, and usually a new
+# memory page, at almost every probe once the list no longer fits in the CPU cache.   The list
+# makes it worse because its items are pointers to int objects stored elsewhere.   The Eytzinger
+# layout stores the same keys in the order of a breadth-first walk of the binary search tree:
+# the root at position 1 and the children of position k at 2k and 2k + 1.   The first levels of
+# every search are then packed into a few cache lines that stay hot, and the keys are plain
+# 8-byte integers in one array.   Filling the tree is an in-order walk that takes the sorted keys
+# one after another, so building it is O(n).   Position 0 is unused.
+def eytzinger_fill(sorted_keys, tree):
+    size = len(sorted_keys)
+    keys = iter(sorted_keys)
+    stack = []
+    k = 1
+    while stack or k <= size:
+        if k <= size:
+            stack.append(k)
+            k *= 2  # Go down to the left child first
+        else:
+            k = stack.pop()
+            tree[k] = next(keys)
+            k = 2 * k + 1
+
+
+# Example 10:  A pure Python walk over 10**8 keys is far too slow, so with NumPy the tree is
+# built one level at a time.   Every position k on a level gets the key whose rank is the number
+# of keys before k's subtree (offset) plus the size of its left subtree.   The subtree sizes of a
+# whole level are counted one level further down at a time, which adds up to O(n) over the tree.
+# Filling the tree a level at a time also keeps only one level of ranks in memory.
+def subtree_sizes(roots, size):
+    counts = np.zeros(len(roots), dtype=np.int64)
+    low = roots.copy()
+    high = roots.copy()
+    while low[0] <= size:
+        counts += np.clip(np.minimum(high, size) - low + 1, 0, None)
+        low = 2 * low
+        high = 2 * high + 1
+    return counts
+
+def eytzinger_levels(size):
+    # Yields the first position of every level and the ranks of the keys stored on it
+    offsets = np.zeros(1, dtype=np.int64)
+    first = 1
+    while first <= size:
+        positions = np.arange(first, min(2 * first, size + 1), dtype=np.int64)
+        offsets = offsets[:len(positions)]
+        left_sizes = subtree_sizes(2 * positions, size)
+        del positions
+        yield first, offsets + left_sizes
+        child_offsets = np.empty(2 * len(offsets), dtype=np.int64)
+        child_offsets[0::2] = offsets
+        child_offsets[1::2] = offsets + left_sizes + 1
+        offsets = child_offsets
+        first *= 2
+
+
+# Example 11:  The lower bound search goes down the tree, to the right child whenever the key is
+# smaller than the goal.   The bits of k record every turn; stripping the trailing right turns
+# and then the last left turn gives the position where the search last went left, which holds the
+# smallest key that is not less than the goal.   k == 0 means every key is less than the goal,
+# where bisect_left would return len(keys).   lower_bound_many runs the same search for a whole
+# NumPy batch at once, one tree level per step.
+class EytzingerIndex:
+    def __init__(self, sorted_keys):
+        self.size = len(sorted_keys)
+        if np is not None:
+            keys = np.asarray(sorted_keys, dtype=np.int64)
+            self.tree = np.zeros(self.size + 1, dtype=np.int64)
+            for first, ranks in eytzinger_levels(self.size):
+                self.tree[first:first + len(ranks)] = keys[ranks]
+        else:
+            self.tree = array('q', bytes(8 * (self.size + 1)))
+            eytzinger_fill(sorted_keys, self.tree)
+        self.view = memoryview(self.tree)  # Indexing gives Python ints, without a copy
+
+    def __len__(self):
+        return self.size
+
+    def lower_bound(self, goal, default=None):
+        tree = self.view
+        size = self.size
+        k = 1
+        while k <= size:
+            k = 2 * k + (tree[k] < goal)
+        k >>= (~k & (k + 1)).bit_length()
+        return tree[k] if k else default
+
+    def lower_bound_many(self, goals, default=-1):
+        tree = self.tree
+        goals = np.asarray(goals)
+        k = np.ones(len(goals), dtype=np.int64)
+        for _ in range(self.size.bit_length()):
+            inside = k <= self.size
+            probe = tree[np.where(inside, k, 0)]
+            k = np.where(inside, 2 * k + (probe < goals), k)
+        k >>= np.log2(~k & (k + 1)).astype(np.int64) + 1
+        return np.where(k > 0, tree[k], default)
+
+
+# Example 12:  Comparing lower bound lookups on 10**5 random goals, in nanoseconds per lookup.
+# Looping over lower_bound in Python runs about log2(n) bytecode iterations per goal where
+# bisect_left runs its loop in C, so the layout only pays off once the search itself is compiled:
+# lower_bound_many against searchsorted over the same sorted keys.   The small sizes run by
+# default; pass --full on the command line to also run 10**7 and 10**8 keys, which need a few GB
+# of memory.   At 10**8 a list of ints no longer fits here, so bisect_left searches the sorted
+# keys through a memoryview instead.
+import sys
+import time
+
+full = '--full' in sys.argv
+eytzinger_sizes = [10**5, 10**6, 10**7, 10**8] if full else [10**5, 10**6]
+goal_count = 10**5
+
+def time_per_lookup(func, *args):
+    elapsed = min(timeit.repeat(lambda: func(*args), repeat=3, number=1))
+    return elapsed / goal_count * 1e9
+
+def loop_bisect(keys, goals):
+    for goal in goals:
+        bisect_left(keys, goal)
+
+def loop_lower_bound(index, goals):
+    for goal in goals:
+        index.lower_bound(goal)
+
+print(f'{"keys":>12} {"build":>8} {"bisect":>8} {"eytz":>8} {"search":>8} {"eytz many":>10}')
+for key_count in eytzinger_sizes:
+    if np is not None:
+        sorted_keys = np.arange(0, 2 * key_count, 2, dtype=np.int64)
+    else:
+        sorted_keys = array('q', range(0, 2 * key_count, 2))
+    goals = [random.randint(0, 2 * key_count) for _ in range(goal_count)]
+
+    start = time.perf_counter()
+    eytzinger_index = EytzingerIndex(sorted_keys)
+    build = time.perf_counter() - start
+
+    if key_count <= 10**7:
+        bisect_keys = sorted_keys.tolist()
+    else:
+        bisect_keys = memoryview(sorted_keys)
+    row = (f'{key_count:>12,} {build:>7.2f}s '
+           f'{time_per_lookup(loop_bisect, bisect_keys, goals):>6.0f}ns '
+           f'{time_per_lookup(loop_lower_bound, eytzinger_index, goals):>6.0f}ns')
+    del bisect_keys
+
+    if np is not None:
+        goal_array = np.asarray(goals)
+        row += (f' {time_per_lookup(np.searchsorted, sorted_keys, goal_array):>6.0f}ns'
+                f' {time_per_lookup(eytzinger_index.lower_bound_many, goal_array):>8.0f}ns')
+    print(row)
+    del eytzinger_index, sorted_keys
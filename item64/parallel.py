@@ -0,0 +1,178 @@
+"""
+A reusable parallel map for the Item 64 workloads.
+
+run_parallel.py starts a new ProcessPoolExecutor for every run and calls pool.map with the default
+chunksize of 1, so every pair is pickled and sent to a child on its own.   WarmPool fixes three
+things:
+
+(1)  The pool is created once and kept warm, so later calls don't pay for starting processes.
+(2)  The chunksize is picked from the measured cost per item, so each chunk is big enough to
+hide the pickling overhead but small enough to keep every worker busy.   The cost is measured in
+the workers on the first call for each function and remembered for later calls.
+(3)  Large numeric inputs can go through shared memory.   Only the name of the block and a range
+of rows is pickled for each chunk.
+
+Results are streamed back in order as the chunks finish.
+"""
+
+import math
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def _run_chunk(func, chunk):
+    return [func(item) for item in chunk]
+
+
+def _run_timed_chunk(func, chunk):
+    start = time.perf_counter()
+    results = [func(item) for item in chunk]
+    return results, time.perf_counter() - start
+
+
+def _attach(name):
+    # Before Python 3.13 attaching also registers the block with the resource tracker.   The
+    # workers share the parent's tracker (see WarmPool.__init__), which keeps one entry per name,
+    # so that is harmless: the parent's unlink removes the entry.   Unregistering here would remove
+    # it too early and make the parent's unlink fail in the tracker.
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _run_shared_chunk(func, name, typecode, width, start, stop):
+    memory = _attach(name)
+    try:
+        itemsize = array(typecode).itemsize
+        with memory.buf[:stop * width * itemsize].cast(typecode) as values:
+            return [func(tuple(values[i * width:(i + 1) * width]))
+                    for i in range(start, stop)]
+    finally:
+        memory.close()
+
+
+def _run_timed_shared_chunk(func, name, typecode, width, start, stop):
+    begin = time.perf_counter()
+    results = _run_shared_chunk(func, name, typecode, width, start, stop)
+    return results, time.perf_counter() - begin
+
+
+class WarmPool:
+    def __init__(self, max_workers=None, target_chunk_seconds=0.05):
+        self.max_workers = max_workers or os.cpu_count()
+        self.target_chunk_seconds = target_chunk_seconds
+        self.costs = {}   # Measured seconds per item for each func
+        if os.name == 'posix':
+            # Start the tracker before the workers so they all share it, instead of each
+            # starting its own that would unlink blocks still in use when the worker exits.
+            resource_tracker.ensure_running()
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.warm_up()
+
+    def warm_up(self):
+        # Submitting one task per worker makes the executor start them all now.
+        futures = [self.pool.submit(_worker_pid)
+                   for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    def pick_chunksize(self, seconds_per_item, count):
+        by_cost = int(self.target_chunk_seconds / max(seconds_per_item, 1e-9))
+        by_balance = math.ceil(count / (self.max_workers * 4))
+        return max(1, min(by_cost, by_balance))
+
+    def map(self, func, items, chunksize=None):
+        """Yield func(item) for every item, in order.
+
+        Without a chunksize, the first call for func runs one item on each worker to measure
+        their cost; their results are yielded first, so the measurement isn't wasted.
+        """
+        items = list(items)
+        if chunksize is None:
+            cost = self.costs.get(func)
+            if cost is None and items:
+                sample = items[:self.max_workers]
+                futures = [self.pool.submit(_run_timed_chunk, func, [item])
+                           for item in sample]
+                total = 0.0
+                for future in futures:
+                    results, elapsed = future.result()
+                    total += elapsed
+                    yield from results
+                items = items[len(sample):]
+                cost = self.costs[func] = total / len(sample)
+            chunksize = self.pick_chunksize(cost or 0.0, len(items))
+
+        chunks = (items[i:i + chunksize]
+                  for i in range(0, len(items), chunksize))
+        yield from self._stream(_run_chunk, ((func, c) for c in chunks))
+
+    def map_shared(self, func, values, width=1, typecode='q', chunksize=None):
+        """Like map for rows of width numbers stored in an array of typecode.
+
+        The rows are copied into shared memory once and each chunk only names a range of rows.
+        func receives each row as a tuple.  Chunk sizes come from the measured cost of func, as in
+        map.  Raises ValueError if values doesn't hold a whole number of rows.
+        """
+        values = array(typecode, values)
+        if width < 1 or len(values) % width:
+            raise ValueError(f'{len(values)} values do not split into '
+                             f'rows of width {width}')
+        rows = len(values) // width
+
+        memory = shared_memory.SharedMemory(
+            create=True, size=max(len(values) * values.itemsize, 1))
+        try:
+            memory.buf[:len(values) * values.itemsize] = values.tobytes()
+            first = 0
+            if chunksize is None:
+                cost = self.costs.get(func)
+                if cost is None and rows:
+                    first = min(self.max_workers, rows)
+                    futures = [self.pool.submit(_run_timed_shared_chunk, func,
+                                                memory.name, typecode, width,
+                                                row, row + 1)
+                               for row in range(first)]
+                    total = 0.0
+                    for future in futures:
+                        results, elapsed = future.result()
+                        total += elapsed
+                        yield from results
+                    cost = self.costs[func] = total / first
+                chunksize = self.pick_chunksize(cost or 0.0, rows - first)
+
+            tasks = ((func, memory.name, typecode, width,
+                      start, min(start + chunksize, rows))
+                     for start in range(first, rows, chunksize))
+            yield from self._stream(_run_shared_chunk, tasks)
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def _stream(self, run, tasks):
+        # Keep a bounded number of chunks in flight and yield them in submission order.
+        in_flight = []
+        window = self.max_workers * 2
+        for args in tasks:
+            in_flight.append(self.pool.submit(run, *args))
+            if len(in_flight) >= window:
+                yield from in_flight.pop(0).result()
+        for future in in_flight:
+            yield from future.result()
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,49 @@
+#!/usr/bin/env PYTHONHASHSEED=1234 python3
+
+import my_module
+import random
+import time
+
+"""
+Compare the original gcd with Euclid, binary gcd, the batch path (NumPy when installed),
+and the process pool path.
+"""
+
+NUMBERS = [
+    (1963309, 2265973), (2030677, 3814172),
+    (1551645, 2229620), (2039045, 2020802),
+    (1823712, 1924928), (2293129, 1020491),
+    (1281238, 2273782), (3823812, 4237281),
+    (3812741, 4729139), (1292391, 2123811),
+]
+
+def timed(label, func, *args):
+    start = time.time()
+    results = func(*args)
+    end = time.time()
+    delta = end - start
+    print(f'{label:<28} took {delta:.3f} seconds')
+    return results
+
+def main():
+    expected = timed('Original gcd', lambda: list(map(my_module.gcd, NUMBERS)))
+    for func in (my_module.gcd_euclid, my_module.gcd_binary):
+        results = timed(func.__name__, lambda: list(map(func, NUMBERS)))
+        assert results == expected
+    assert timed('gcd_batch', my_module.gcd_batch, NUMBERS) == expected
+
+    random.seed(1234)
+    pairs = [(random.randrange(1, 10**12), random.randrange(1, 10**12))
+             for _ in range(1_000_000)]
+    print(f'{len(pairs):,} random pairs '
+          f'(NumPy {"on" if my_module.np is not None else "off"}):')
+    expected = timed('gcd_euclid', lambda: list(map(my_module.gcd_euclid, pairs)))
+    assert timed('gcd_batch', my_module.gcd_batch, pairs) == expected
+    assert timed('gcd_parallel', my_module.gcd_parallel, pairs) == expected
+    if my_module.np is not None:
+        array = my_module.np.array(pairs, dtype=my_module.np.int64)
+        results = timed('gcd_batch on an array', my_module.gcd_batch, array)
+        assert results.tolist() == expected
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env PYTHONHASHSEED=1234 python3
+
+import itertools
+import my_module
+from parallel import WarmPool
+import time
+
+"""
+Calculate the gcd of the same pairs several times with one warm pool.   The first call measures
+the cost per item in the workers; later calls reuse that cost and the running worker processes.
+The shared memory runs pass the pairs through shared memory; the one on a fresh pool measures the
+cost itself.
+"""
+
+NUMBERS = [
+    (1963309, 2265973), (2030677, 3814172),
+    (1551645, 2229620), (2039045, 2020802),
+    (1823712, 1924928), (2293129, 1020491),
+    (1281238, 2273782), (3823812, 4237281),
+    (3812741, 4729139), (1292391, 2123811),
+]
+
+def main():
+    expected = list(map(my_module.gcd_euclid, NUMBERS))
+    with WarmPool() as pool:
+        for i in range(3):
+            start = time.time()
+            results = list(pool.map(my_module.gcd, NUMBERS))
+            end = time.time()
+            delta = end - start
+            assert results == expected
+            print(f'Run {i}: took {delta:.3f} seconds')
+
+        start = time.time()
+        flat = list(itertools.chain.from_iterable(NUMBERS))
+        results = list(pool.map_shared(my_module.gcd, flat, width=2))
+        end = time.time()
+        delta = end - start
+        assert results == expected
+        print(f'Shared memory run: took {delta:.3f} seconds')
+
+        assert list(pool.map(my_module.gcd, [])) == []
+        assert list(pool.map_shared(my_module.gcd, [], width=2)) == []
+
+        try:
+            list(pool.map_shared(my_module.gcd, flat[:-1], width=2))
+        except ValueError:
+            pass  # Expected: the last pair is missing a number
+        else:
+            assert False
+
+    with WarmPool() as pool:
+        results = list(pool.map_shared(my_module.gcd, flat, width=2))
+        assert results == expected
+        assert my_module.gcd in pool.costs
+        print('Shared memory run on a fresh pool: '
+              f'chunksize {pool.pick_chunksize(pool.costs[my_module.gcd], len(NUMBERS))}')
+
+if __name__ == '__main__':
+    main()